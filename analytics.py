@@ -0,0 +1,401 @@
+"""Functions that stream archived Tic-Tac-Toe games into statistics.
+
+    Finished games are archived one JSON record per line. Each record holds
+    both usernames, the moves in the same form they are sent over the socket
+    (for example "01", "center11" or "boom20") and the username of the winner,
+    or None for a tie. Player1 is always X and moves first.
+
+    Archives can be much larger than memory, so they are read in chunks
+    through mmap, filtered and folded into a GameStats object one record at a
+    time. Big archives are split into shards that are folded by worker
+    processes, and the partial GameStats are merged at the end.
+
+    Typical usage example:
+
+    stats = analyze(["game_archive.jsonl"])
+    stats.printStats("Raymond")
+"""
+
+
+import json
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from gameboard import BoardClass
+
+
+ARCHIVE_PATH = "game_archive.jsonl"
+CHUNK_SIZE = 1 << 20
+SHARD_SIZE = 64 << 20
+LINES = ((0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6))
+_MOVE = re.compile(r"(center|boom)?[0-2][0-2]")
+
+
+def makeRecord(p1_username: str, p2_username: str, moves: list, winner: str, seed: int = None,
+               game: int = None) -> dict:
+    """Makes an archive record of a finished game.
+
+    Args:
+        p1_username: str value of the username of player1 (X)
+        p2_username: str value of the username of player2 (O)
+        moves: A list of the moves in the order they were sent over the socket
+        winner: str value of the username of the winner, or None for a tie
+        seed: int seed of the room the bomb events were drawn from, or None
+        game: int number of the game in its room, or None
+
+    Returns:
+        A dict containing the record
+    """
+    record = {"p1": p1_username, "p2": p2_username, "moves": list(moves), "winner": winner}
+    if seed is not None:
+        record["seed"] = seed
+        record["game"] = game
+    return record
+
+
+def appendRecord(record: dict, path: str = ARCHIVE_PATH) -> None:
+    """Appends a record to the end of an archive.
+
+    Args:
+        record: A dict made by makeRecord()
+        path: str value of the path of the archive
+    """
+    with open(path, "a", encoding="utf-8") as archive:
+        archive.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def _lineStart(view: mmap.mmap, offset: int) -> int:
+    """Finds where the first line starting at or after an offset begins.
+
+    Args:
+        view: A mmap of the archive
+        offset: int value of a byte offset into the archive
+
+    Returns:
+        An int containing the offset of the start of the line
+    """
+    if offset <= 0:
+        return 0
+    if offset >= len(view):
+        return len(view)
+    newline = view.find(b"\n", offset - 1)
+    return len(view) if newline == -1 else newline + 1
+
+
+def readRecords(path: str, start: int = 0, end: int = None, chunk_size: int = CHUNK_SIZE):
+    """Reads the records of an archive, or of one shard of it, a chunk at a time.
+
+    A record belongs to the shard its line starts in, so shards that split an
+    archive at any offsets still read every record exactly once. Lines that are
+    not valid JSON, such as a record cut off by a crash, are skipped.
+
+    Args:
+        path: str value of the path of the archive
+        start: int value of the byte offset the shard starts at
+        end: int value of the byte offset the shard ends at, defaults to the end of the archive
+        chunk_size: int number of bytes to read at a time
+
+    Yields:
+        A dict for every record in the shard
+    """
+    with open(path, "rb") as archive:
+        if os.fstat(archive.fileno()).st_size == 0:
+            return
+        with mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            first = _lineStart(view, start)
+            last = _lineStart(view, len(view) if end is None else end)
+            tail = b""
+            for offset in range(first, last, chunk_size):
+                lines = (tail + view[offset:min(offset + chunk_size, last)]).split(b"\n")
+                tail = lines.pop()
+                for line in lines:
+                    record = _decode(line)
+                    if record is not None:
+                        yield record
+            record = _decode(tail)
+            if record is not None:
+                yield record
+
+
+def _decode(line: bytes) -> dict:
+    """Decodes one line of an archive.
+
+    Args:
+        line: bytes of one line without its newline
+
+    Returns:
+        A dict containing the record, or None if the line is empty or broken
+    """
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not isinstance(record.get("p1"), str) or \
+            not isinstance(record.get("p2"), str) or not isinstance(record.get("winner", None), (str, type(None))):
+        return None
+    moves = record.get("moves")
+    if not isinstance(moves, list) or not moves or \
+            not all(isinstance(move, str) and _MOVE.fullmatch(move) for move in moves):
+        return None
+    return record
+
+
+def _replay(moves: list) -> tuple:
+    """Replays the moves of a game, bomb events included.
+
+    Args:
+        moves: A list of moves as they were sent over the socket
+
+    Returns:
+        A tuple of the final board as a flat list, a list of the characters
+        whose piece was removed from the center by a center bomb, and a set of
+        the characters who had three in a row when their center piece was removed
+    """
+    board = [" "] * 9
+    cleared = []
+    denied = set()
+    for number, move in enumerate(moves):
+        player = "X" if number % 2 == 0 else "O"
+        board[int(move[-2]) * 3 + int(move[-1])] = player
+        if move.startswith("center"):
+            if board[4] != " ":
+                cleared.append(board[4])
+                if _hasLine(board, board[4]):
+                    denied.add(board[4])
+            board[4] = " "
+        elif move.startswith("boom"):
+            board = [" "] * 9
+    return board, cleared, denied
+
+
+def _hasLine(board: list, player: str) -> bool:
+    """Checks if a player has three in a row on a flat board.
+
+    Args:
+        board: A flat list of the 9 squares of a board
+        player: A string containing character "X" or "O"
+
+    Returns:
+        A bool value indicating if the player has a line
+    """
+    return any(board[a] == player and board[b] == player and board[c] == player for a, b, c in LINES)
+
+
+class GameStats:
+    """A simple class that folds archived games into totals.
+
+    Every total is a count, so the memory used only depends on the number of
+    users, never on the number of games.
+
+    Attributes:
+        games: The number of games folded in
+        openings: A dict of opening square to [games, player1 wins, ties]
+        center_clears: The number of games with at least one center bomb that removed a piece
+        center_flips: The number of games where a center piece completing a line was removed and that player did not win
+        users: A dict of username to [wins, ties, losses, games, moves]
+    """
+
+    def __init__(self) -> None:
+        """Make a GameStats.
+        """
+        self.games = 0
+        self.openings = {}
+        self.center_clears = 0
+        self.center_flips = 0
+        self.users = {}
+
+    def fold(self, record: dict) -> None:
+        """Adds one game to the totals.
+
+        Args:
+            record: A dict made by makeRecord()
+        """
+        moves = record["moves"]
+        winner = record.get("winner")
+        self.games += 1
+        opening = self.openings.setdefault(moves[0][-2:], [0, 0, 0])
+        opening[0] += 1
+        if winner is None:
+            opening[2] += 1
+        elif winner == record["p1"]:
+            opening[1] += 1
+        board, cleared, denied = _replay(moves)
+        if cleared:
+            self.center_clears += 1
+            marks = {record["p1"]: "X", record["p2"]: "O"}
+            if any(marks.get(winner) != player for player in denied):
+                self.center_flips += 1
+        for username in (record["p1"], record["p2"]):
+            totals = self.users.setdefault(username, [0, 0, 0, 0, 0])
+            if winner is None:
+                totals[1] += 1
+            elif winner == username:
+                totals[0] += 1
+            else:
+                totals[2] += 1
+            totals[3] += 1
+            totals[4] += len(moves)
+
+    def merge(self, other: "GameStats") -> None:
+        """Adds the totals of another GameStats to these totals.
+
+        Args:
+            other: A GameStats folded over different records
+        """
+        self.games += other.games
+        self.center_clears += other.center_clears
+        self.center_flips += other.center_flips
+        for square, counts in other.openings.items():
+            totals = self.openings.setdefault(square, [0, 0, 0])
+            for i, count in enumerate(counts):
+                totals[i] += count
+        for username, counts in other.users.items():
+            totals = self.users.setdefault(username, [0, 0, 0, 0, 0])
+            for i, count in enumerate(counts):
+                totals[i] += count
+
+    def winRateByOpening(self) -> dict:
+        """Gets how often player1 wins for each opening square.
+
+        Returns:
+            A dict of (x, y) opening square to the fraction of those games player1 won
+        """
+        return {(int(square[0]), int(square[1])): counts[1] / counts[0]
+                for square, counts in sorted(self.openings.items())}
+
+    def centerFlipRate(self) -> float:
+        """Gets how often a center bomb changed the result of a game it happened in.
+
+        Returns:
+            A float containing the fraction of games with a center clear that it flipped
+        """
+        return self.center_flips / self.center_clears if self.center_clears else 0.0
+
+    def averageGameLength(self, username: str) -> float:
+        """Gets the average number of moves in the games of a user.
+
+        Args:
+            username: str value of the username to look up
+
+        Returns:
+            A float containing the average number of moves per game
+        """
+        totals = self.users.get(username)
+        return totals[4] / totals[3] if totals else 0.0
+
+    def userBoard(self, username: str) -> BoardClass:
+        """Makes a BoardClass holding the all time totals of a user.
+
+        Args:
+            username: str value of the username to look up
+
+        Returns:
+            A BoardClass with the wins, ties, losses and games of the user
+        """
+        board = BoardClass(username)
+        wins, ties, losses, games, _ = self.users.get(username, [0, 0, 0, 0, 0])
+        board.addTotals(wins, ties, losses, games)
+        return board
+
+    def printStats(self, username: str) -> None:
+        """Prints out the all time game statistics of a user.
+
+        Args:
+            username: str value of the username to look up
+        """
+        self.userBoard(username).printStats()
+
+
+def filterRecords(records, predicate=None):
+    """Keeps only the records a predicate accepts.
+
+    Args:
+        records: An iterable of records
+        predicate: A function taking a record and returning a bool, or None to keep every record
+
+    Yields:
+        Every record the predicate accepts
+    """
+    for record in records:
+        if predicate is None or predicate(record):
+            yield record
+
+
+def foldRecords(records) -> GameStats:
+    """Folds records into a new GameStats.
+
+    Args:
+        records: An iterable of records
+
+    Returns:
+        A GameStats with the totals of the records
+    """
+    stats = GameStats()
+    for record in records:
+        stats.fold(record)
+    return stats
+
+
+def _foldShard(shard: tuple) -> GameStats:
+    """Folds one shard of an archive, run in a worker process.
+
+    Args:
+        shard: A tuple of path, start offset, end offset and predicate
+
+    Returns:
+        A GameStats with the totals of the shard
+    """
+    path, start, end, predicate = shard
+    return foldRecords(filterRecords(readRecords(path, start, end), predicate))
+
+
+def analyze(paths: list, predicate=None, workers: int = None, shard_size: int = SHARD_SIZE,
+            sizes: list = None) -> GameStats:
+    """Folds every record of some archives into one GameStats.
+
+    Args:
+        paths: A list of paths of archives
+        predicate: A module level function taking a record and returning a bool, or None to keep every record
+        workers: int number of worker processes, defaults to the number of cores
+        shard_size: int number of bytes of archive folded by one worker at a time
+        sizes: A list of the int number of bytes to fold of each archive, defaults to their current sizes
+
+    Returns:
+        A GameStats with the totals of every accepted record
+
+    Raises:
+        ValueError: sizes does not have one size per archive
+    """
+    shards = []
+    if sizes is None:
+        sizes = [os.path.getsize(path) for path in paths]
+    elif len(sizes) != len(paths):
+        raise ValueError("sizes must have one size per archive")
+    for path, size in zip(paths, sizes):
+        shards += [(path, start, min(start + shard_size, size), predicate) for start in range(0, size, shard_size)]
+    workers = max(1, workers or os.cpu_count() or 1)
+    stats = GameStats()
+    if workers == 1 or len(shards) <= 1:
+        for shard in shards:
+            stats.merge(_foldShard(shard))
+        return stats
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+        for partial in pool.map(_foldShard, shards):
+            stats.merge(partial)
+    return stats
+
+
+if __name__ == "__main__":
+    archive_stats = analyze(sys.argv[1:] or [ARCHIVE_PATH])
+    print(f"Number of games: {archive_stats.games}")
+    for square, rate in archive_stats.winRateByOpening().items():
+        print(f"Player1 win rate opening at {square}: {rate:.1%}")
+    print(f"Center clears that flipped the result: {archive_stats.centerFlipRate():.1%}")
+    for name in sorted(archive_stats.users):
+        print()
+        archive_stats.printStats(name)
+        print(f"Average game length: {archive_stats.averageGameLength(name):.1f} moves")
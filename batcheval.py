@@ -0,0 +1,275 @@
+"""Functions that evaluate thousands of Tic-Tac-Toe positions in one call.
+
+    Building training sets and analyzing archives needs the status of huge
+    numbers of positions, and making a BoardClass for each one is far too
+    slow; isWinner and boardIsFull also change the win, loss and tie counters.
+    Instead every 3x3 board is encoded as one base 3 number (" " is 0, "X" is
+    1 and "O" is 2, read row by row), and the answers for all 3^9 boards are
+    worked out once into lookup tables. Evaluating a batch is then one table
+    lookup per position, with the results packed into arrays.
+
+    Typical usage example:
+
+    evaluation = evaluateBatch(boards, player="X", values=True)
+    evaluation.isWinner(0, "X")
+"""
+
+
+from array import array
+
+
+POSITIONS = 3 ** 9
+X_LINE = 1
+O_LINE = 2
+FULL = 4
+LINES = ((0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6))
+_DIGITS = str.maketrans({" ": "0", "X": "1", "O": "2"})
+_tables = {}
+
+
+def encodeBoard(board) -> int:
+    """Encodes a board as a base 3 number.
+
+    Args:
+        board: A 2-dimensional list as returned by BoardClass.getBoard(), or a string of the 9 squares row by row
+
+    Returns:
+        An int between 0 and 3^9 - 1
+
+    Raises:
+        ValueError: The board does not have exactly 3 rows of 3 squares, or a string holds other characters
+    """
+    if isinstance(board, str):
+        if len(board) != 9:
+            raise ValueError(f"a board needs 9 squares, not {len(board)}")
+        if board.strip(" XO"):
+            raise ValueError(f"a board only holds ' ', 'X' and 'O', not {board!r}")
+        return int(board.translate(_DIGITS), 3)
+    if len(board) != 3 or any(len(row) != 3 for row in board):
+        raise ValueError("a board needs 3 rows of 3 squares")
+    cells = "".join(board[0]) + "".join(board[1]) + "".join(board[2])
+    if len(cells) == 9 and not cells.strip(" XO"):
+        return int(cells.translate(_DIGITS), 3)
+    # Squares cleared to "" or holding anything else count as empty.
+    return int("".join(["1" if value == "X" else "2" if value == "O" else "0" for row in board for value in row]), 3)
+
+
+def decodeBoard(code: int) -> list:
+    """Turns a base 3 number back into a board.
+
+    Args:
+        code: int made by encodeBoard()
+
+    Returns:
+        A 2-dimensional list like BoardClass.getBoard() returns
+
+    Raises:
+        ValueError: The code is not between 0 and 3^9 - 1
+    """
+    _checkCode(code)
+    cells = []
+    for _ in range(9):
+        code, digit = divmod(code, 3)
+        cells.append(" XO"[digit])
+    cells.reverse()
+    return [cells[0:3], cells[3:6], cells[6:9]]
+
+
+def _checkCode(code: int) -> int:
+    """Checks that a number is the code of a board.
+
+    Args:
+        code: int that should have been made by encodeBoard()
+
+    Returns:
+        The code
+
+    Raises:
+        ValueError: The code is not between 0 and 3^9 - 1
+    """
+    if not 0 <= code < POSITIONS:
+        raise ValueError(f"{code} is not a board code")
+    return code
+
+
+def _cells(code: int) -> list:
+    """Gets the digits of a base 3 board, first square first.
+
+    Args:
+        code: int made by encodeBoard()
+
+    Returns:
+        A list of 9 ints, 0 for empty, 1 for "X" and 2 for "O"
+    """
+    cells = [0] * 9
+    for i in range(8, -1, -1):
+        code, cells[i] = divmod(code, 3)
+    return cells
+
+
+def _statusTables() -> tuple:
+    """Gets the flags and legal move masks of every board, working them out the first time.
+
+    Returns:
+        A tuple of an array of X_LINE/O_LINE/FULL flags and an array of 9 bit
+        masks of the legal moves, both indexed by board code. A board that
+        already has a line has no legal moves, even with empty squares left.
+    """
+    if "status" not in _tables:
+        flags = array("B", bytes(POSITIONS))
+        legal = array("H", bytes(2 * POSITIONS))
+        for code in range(POSITIONS):
+            cells = _cells(code)
+            flag = 0
+            for a, b, c in LINES:
+                if cells[a] and cells[a] == cells[b] == cells[c]:
+                    flag |= X_LINE if cells[a] == 1 else O_LINE
+            mask = 0
+            for i, value in enumerate(cells):
+                if not value:
+                    mask |= 1 << i
+            flags[code] = flag | (FULL if not mask else 0)
+            legal[code] = 0 if flag else mask
+        _tables["status"] = (flags, legal)
+    return _tables["status"]
+
+
+def _valueTables() -> dict:
+    """Gets the value of every board for each player to move, working them out the first time.
+
+    The value is what the player to move gets with perfect play from both
+    sides and no bomb events: 1 for a win, 0 for a tie and -1 for a loss.
+
+    Returns:
+        A dict of "X" and "O" to an array of values indexed by board code
+    """
+    if "values" not in _tables:
+        flags, legal = _statusTables()
+        powers = [3 ** (8 - i) for i in range(9)]
+        values = {"X": array("b", bytes(POSITIONS)), "O": array("b", bytes(POSITIONS))}
+        # Boards with more pieces are worked out first, so every move leads to a known value.
+        order = sorted(range(POSITIONS), key=lambda code: bin(legal[code]).count("1"))
+        for code in order:
+            flag = flags[code]
+            mask = legal[code]
+            for player, digit, own, other in (("X", 1, X_LINE, O_LINE), ("O", 2, O_LINE, X_LINE)):
+                if flag & other:
+                    values[player][code] = -1
+                elif flag & own:
+                    values[player][code] = 1
+                elif not mask:
+                    values[player][code] = 0
+                else:
+                    opponent = values["O" if player == "X" else "X"]
+                    best = -1
+                    for i in range(9):
+                        if mask >> i & 1:
+                            best = max(best, -opponent[code + digit * powers[i]])
+                            if best == 1:
+                                break
+                    values[player][code] = best
+        _tables["values"] = values
+    return _tables["values"]
+
+
+class BatchEvaluation:
+    """A simple class that holds the evaluation of a batch of positions.
+
+    Attributes:
+        codes: An array of the base 3 code of each position
+        flags: An array of X_LINE, O_LINE and FULL flags of each position
+        legal: An array of 9 bit masks of the legal moves of each position, bit 0 being the top left, with
+            none on positions that already have a line
+        values: An array of the value of each position for the player to move, or None if not asked for
+    """
+
+    def __init__(self, codes: array, flags: array, legal: array, values: array = None) -> None:
+        """Make a BatchEvaluation.
+
+        Args:
+            codes: array of the base 3 code of each position
+            flags: array of the flags of each position
+            legal: array of the legal move masks of each position
+            values: array of the values of each position, or None
+        """
+        self.codes = codes
+        self.flags = flags
+        self.legal = legal
+        self.values = values
+
+    def isWinner(self, index: int, player: str) -> bool:
+        """Checks a position like BoardClass.isWinner, without changing any statistics.
+
+        Args:
+            index: int value of the position in the batch
+            player: A string that is either a 'X' or 'O'
+
+        Returns:
+            A bool value that indicates if the player has three in a row
+        """
+        return bool(self.flags[index] & (X_LINE if player == "X" else O_LINE))
+
+    def boardIsFull(self, index: int) -> bool:
+        """Checks a position like BoardClass.boardIsFull, without changing any statistics.
+
+        Args:
+            index: int value of the position in the batch
+
+        Returns:
+            A bool value indicating if the board is full or not
+        """
+        return bool(self.flags[index] & FULL)
+
+    def legalMoves(self, index: int) -> list:
+        """Gets the empty squares of a position, or none if a player already has a line.
+
+        Args:
+            index: int value of the position in the batch
+
+        Returns:
+            A list of (x, y) tuples
+        """
+        mask = self.legal[index]
+        return [divmod(i, 3) for i in range(9) if mask >> i & 1]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def evaluateBatch(boards, player=None, values: bool = False) -> BatchEvaluation:
+    """Evaluates many positions at once.
+
+    Args:
+        boards: An iterable of boards as BoardClass.getBoard() lists, 9 square strings or codes from encodeBoard()
+        player: A string containing the player to move in every position, or a sequence of one per position
+        values: bool containing whether or not to work out the value of each position for the player to move
+
+    Returns:
+        A BatchEvaluation of the positions in the order they were given
+
+    Raises:
+        ValueError: A board is not 3 rows of 3 squares, a code is out of range, or a player is not "X" or "O" or
+            there is not one per position
+    """
+    codes = array("H", [_checkCode(board) if isinstance(board, int) else encodeBoard(board) for board in boards])
+    flag_table, legal_table = _statusTables()
+    flags = array("B", [flag_table[code] for code in codes])
+    legal = array("H", [legal_table[code] for code in codes])
+    position_values = None
+    if values:
+        if player is None:
+            raise ValueError("the player to move is needed to work out values")
+        value_tables = _valueTables()
+        if isinstance(player, str):
+            if player not in value_tables:
+                raise ValueError(f"the player to move must be 'X' or 'O', not {player!r}")
+            table = value_tables[player]
+            position_values = array("b", [table[code] for code in codes])
+        else:
+            movers = list(player)
+            if len(movers) != len(codes):
+                raise ValueError(f"{len(movers)} players to move for {len(codes)} positions")
+            if not set(movers) <= value_tables.keys():
+                raise ValueError("every player to move must be 'X' or 'O'")
+            position_values = array("b", [value_tables[mover][code] for code, mover in zip(codes, movers)])
+    return BatchEvaluation(codes, flags, legal, position_values)
@@ -0,0 +1,129 @@
+"""Classes that decide the bomb events of games on the host.
+
+    random_bomb used to be rolled by whichever player just moved, with the
+    global random module, so the two players decided bomb events on their own
+    and no game could be played back. The BombScheduler belongs to the host:
+    one per room, with the room's seed and chances and one random number
+    generator. Every game started in the room takes a block of BLOCK_SIZE
+    events from it up front, so a move only has to look its event up.
+
+    A game takes the same amount from the room's generator however it goes,
+    so the events of the room's n-th game only depend on the seed and n. The
+    host archives both with every game, and the moves in the archive carry
+    the events that happened.
+
+    Typical usage example:
+
+    scheduler = BombScheduler(seed)
+    bombs = scheduler.newGame()
+    event = bombs.nextEvent()
+"""
+
+
+import random
+import secrets
+from itertools import accumulate
+
+
+CENTER_BOMB_CHANCE = 1 / 9
+BOARD_BOMB_CHANCE = 1 / 99
+BLOCK_SIZE = 18
+EVENTS = ("center", "boom", "")
+
+
+def newRoomSeed() -> int:
+    """Makes a random seed for a room.
+
+    Returns:
+        An int that can be archived to play the room's bomb events back
+    """
+    return secrets.randbits(64)
+
+
+class GameBombs:
+    """A simple class that hands out the bomb events of one game.
+
+    Attributes:
+        game: The number of games the room started before this one
+        moves: The number of events handed out so far
+    """
+
+    def __init__(self, game: int, events: list, spare_seed: int, scheduler: "BombScheduler") -> None:
+        """Make a GameBombs. Use BombScheduler.newGame() instead.
+
+        Args:
+            game: int number of games the room started before this one
+            events: A list of the first events of the game
+            spare_seed: int seed of the events after the first block, for games that run longer
+            scheduler: The BombScheduler of the room
+        """
+        self.game = game
+        self.moves = 0
+        self._events = events
+        self._spare_seed = spare_seed
+        self._scheduler = scheduler
+        self._spare = None
+
+    def nextEvent(self) -> str:
+        """Gets the bomb event of the next move.
+
+        Returns:
+            A string containing "center", "boom" or "" if nothing happens
+        """
+        if self.moves == len(self._events):
+            # Only games that are reset by a bomb get this far.
+            if self._spare is None:
+                self._spare = random.Random(self._spare_seed)
+            self._events += self._scheduler.drawEvents(self._spare)
+        event = self._events[self.moves]
+        self.moves += 1
+        return event
+
+
+class BombScheduler:
+    """A simple class that draws the bomb events of every game of a room.
+
+    Attributes:
+        seed: The seed of the room
+        center_chance: The chance of the center being cleared after a move
+        board_chance: The chance of the whole board being cleared after a move that did not clear the center
+        games: The number of games started so far
+    """
+
+    def __init__(self, seed: int = None, center_chance: float = CENTER_BOMB_CHANCE,
+                 board_chance: float = BOARD_BOMB_CHANCE) -> None:
+        """Make a BombScheduler.
+
+        Args:
+            seed: int seed of the room, random if not given
+            center_chance: float chance of the center being cleared after a move
+            board_chance: float chance of the whole board being cleared after a move that did not clear the center
+        """
+        self.seed = newRoomSeed() if seed is None else seed
+        self.center_chance = center_chance
+        self.board_chance = board_chance
+        self.games = 0
+        self._rng = random.Random(self.seed)
+        self._cum_weights = list(accumulate((center_chance, (1 - center_chance) * board_chance,
+                                             (1 - center_chance) * (1 - board_chance))))
+
+    def newGame(self) -> GameBombs:
+        """Starts the next game of the room.
+
+        Returns:
+            A GameBombs handing out the game's events
+        """
+        bombs = GameBombs(self.games, self.drawEvents(self._rng), self._rng.getrandbits(64), self)
+        self.games += 1
+        return bombs
+
+    def drawEvents(self, rng: random.Random) -> list:
+        """Draws a block of events with the room's chances.
+
+        Args:
+            rng: The random number generator to draw with
+
+        Returns:
+            A list of BLOCK_SIZE events
+        """
+        return rng.choices(EVENTS, cum_weights=self._cum_weights, k=BLOCK_SIZE)
@@ -30,6 +30,7 @@ class BoardClass:
         """
         self._username = username
         self._last_player = None
+        self._last_mark = None
         self._wins = 0
         self._ties = 0
         self._losses = 0
@@ -50,9 +51,11 @@ class BoardClass:
         self._games += 1
 
     def resetGameBoard(self) -> None:
-        """Resets the game board for the User to original state.
+        """Resets the game board and last player for the User to original state.
         """
         self._board = [[" " for _ in range(3)] for i in range(3)]
+        self._last_player = None
+        self._last_mark = None
 
     def updateGameBoard(self, x: int, y: int, player: str, player_username: str) -> None:
         """Updates the game board and last person who used a move.
@@ -64,10 +67,33 @@ class BoardClass:
             player_username: str value of the username of the player who made a move
         """
         self._last_player = player_username  # Player will be x or y
+        self._last_mark = player
         self._board[x][y] = player
 
-    def bomb_center_board(self):
-        self._board[1][1] = ""
+    def isValidMove(self, x: int, y: int, player: str) -> bool:
+        """Checks a move against the game board without changing anything.
+
+        Turn order goes by character rather than username, since nothing stops
+        both players from picking the same username.
+
+        Args:
+            x: int value of x-position of the move
+            y: int value of y-position of the move
+            player: str value of what character the player making the move is
+
+        Returns:
+            A bool value indicating if the move is on the board, on an empty square and not a second move in a row
+        """
+        if not (0 <= x < len(self._board) and 0 <= y < len(self._board[x])):
+            return False
+        if self._board[x][y] in ("X", "O"):
+            return False
+        return self._last_mark != player
+
+    def bomb_center_board(self) -> None:
+        """Clears the center square of the game board.
+        """
+        self._board[1][1] = " "
 
     def increaseLoss(self) -> None:
         """Increments the number of losses.
@@ -89,7 +115,23 @@ class BoardClass:
         Returns:
             A bool value that indicates if a player has won or not.
         """
-        winner = None
+        winner = True if self.hasLine(player) else None
+        if winner and self._username == self._last_player:
+            self._wins += 1
+        elif winner and self._username != self._last_player:
+            self._losses += 1
+        return winner
+
+    def hasLine(self, player: str) -> bool:
+        """Checks to see if a player has three in a row without changing any statistics.
+
+        Args:
+            player: A string that is either a 'X' or 'O'
+
+        Returns:
+            A bool value that indicates if the player has three in a row.
+        """
+        winner = False
         top_left = self._board[0][0]
         top_mid = self._board[0][1]
         top_right = self._board[0][2]
@@ -115,14 +157,22 @@ class BoardClass:
             winner = True
         elif top_right == player and mid_mid == player and bot_left == player:
             winner = True
-        if winner and self._username == self._last_player:
-            self._wins += 1
-        elif winner and self._username != self._last_player:
-            self._losses += 1
         return winner
 
     def boardIsFull(self) -> bool:
-        """Checks to see if a board is full of not.
+        """Checks to see if a board is full of not and increments ties if it is.
+
+        Returns:
+            A bool value indicating if a board is full or not
+        """
+        if self.isFull():
+            self._ties += 1
+            return True
+        else:
+            return False
+
+    def isFull(self) -> bool:
+        """Checks to see if a board is full or not without changing any statistics.
 
         Returns:
             A bool value indicating if a board is full or not
@@ -132,11 +182,7 @@ class BoardClass:
             for value in row:
                 if value == " ":
                     full_board = False
-        if full_board == True:
-            self._ties += 1
-            return True
-        else:
-            return False
+        return full_board
 
     def printStats(self) -> None:
         """Prints out game statistics of the user
@@ -164,6 +210,44 @@ class BoardClass:
         """
         return self._last_player
 
+    def addTotals(self, wins: int, ties: int, losses: int, games: int) -> None:
+        """Adds totals from earlier sessions to the statistics of the user.
+
+        Args:
+            wins: int number of wins to add
+            ties: int number of ties to add
+            losses: int number of losses to add
+            games: int number of games played to add
+        """
+        self._wins += wins
+        self._ties += ties
+        self._losses += losses
+        self._games += games
+
+    def getSnapshot(self) -> dict:
+        """Gets everything needed to pick a game back up.
+
+        Returns:
+            A dict containing a copy of the board, the last player and the wins, ties, losses and games
+        """
+        return {"board": [list(row) for row in self._board], "last_player": self._last_player, "wins": self._wins,
+                "ties": self._ties, "losses": self._losses, "games": self._games}
+
+    def loadSnapshot(self, snapshot: dict) -> None:
+        """Picks a game back up from a snapshot.
+
+        Args:
+            snapshot: A dict made by getSnapshot()
+        """
+        self._board = [list(row) for row in snapshot["board"]]
+        self._last_player = snapshot["last_player"]
+        # Snapshots leave the turn to the phase they are sent with.
+        self._last_mark = None
+        self._wins = snapshot["wins"]
+        self._ties = snapshot["ties"]
+        self._losses = snapshot["losses"]
+        self._games = snapshot["games"]
+
     def decrementTies(self) -> None:
         """Decrements the number of ties
         """
@@ -0,0 +1,360 @@
+"""Class that picks moves for a Tic-Tac-Toe board using Monte Carlo Tree Search.
+
+    The MCTSPlayer class searches any BoardClass-compatible position with UCT
+    selection and random playouts. Playouts sample the same chance events as
+    the host's BombScheduler (the center of the board being cleared, or the
+    whole board going BOOM), so the search copes with boards where heuristics
+    fall apart.
+    The search is root parallelized: every worker process grows its own tree
+    within a strict per-move time budget and the visit statistics of the root
+    moves are merged afterwards. Before searching, the opening book and the
+    shared move cache are checked, and searched moves are added to the cache.
+
+    Typical usage example:
+
+    ai = MCTSPlayer(workers=4, time_budget=0.5)
+    move, visits = ai.bestMove(player2_gameboard, "O")
+"""
+
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from bombs import BOARD_BOMB_CHANCE, CENTER_BOMB_CHANCE
+from movecache import MOVE_CACHE, OPENING_BOOK, MoveCache, OpeningBook
+
+
+MARKS = ("X", "O")
+
+
+class _Node:
+    """A node of an open loop search tree.
+
+    Attributes:
+        children: A dict of board index to child _Node
+        visits: The number of playouts that went through the node
+        wins: The score of the player who moved into the node
+    """
+    __slots__ = ("children", "visits", "wins")
+
+    def __init__(self) -> None:
+        """Make a _Node.
+        """
+        self.children = {}
+        self.visits = 0
+        self.wins = 0.0
+
+
+def _lines(size: int) -> list:
+    """Builds every winning line of a square board.
+
+    Args:
+        size: int value of the width of the board
+
+    Returns:
+        A list of tuples of flat board indexes, one tuple per row, column and diagonal
+    """
+    lines = [tuple(x * size + y for y in range(size)) for x in range(size)]
+    lines += [tuple(x * size + y for x in range(size)) for y in range(size)]
+    lines.append(tuple(i * size + i for i in range(size)))
+    lines.append(tuple(i * size + (size - 1 - i) for i in range(size)))
+    return lines
+
+
+def _linesThrough(size: int) -> list:
+    """Builds the winning lines that go through each square of a board.
+
+    Args:
+        size: int value of the width of the board
+
+    Returns:
+        A list indexed by flat board index of the lines going through that square
+    """
+    through = [[] for _ in range(size * size)]
+    for line in _lines(size):
+        for index in line:
+            through[index].append(line)
+    return through
+
+
+def _flatten(board: list) -> list:
+    """Turns a 2-dimensional board into a flat list of marks.
+
+    Args:
+        board: A 2-dimensional list as returned by BoardClass.getBoard()
+
+    Returns:
+        A flat list where every square that is not "X" or "O" is " "
+    """
+    return [value if value in MARKS else " " for row in board for value in row]
+
+
+def _other(player: str) -> str:
+    """Gets the opponent of a player.
+
+    Args:
+        player: A string containing character "X" or "O"
+
+    Returns:
+        A string containing the other character
+    """
+    return "O" if player == "X" else "X"
+
+
+def _play(cells: list, index: int, player: str, through: list, center: int, rng: random.Random,
+          center_chance: float, board_chance: float) -> str:
+    """Plays a move, rolls the bomb events like the BombScheduler and checks the result.
+
+    Args:
+        cells: A flat list of marks that is changed in place
+        index: int value of the flat board index to play
+        player: A string containing character "X" or "O"
+        through: The winning lines that go through each square
+        center: int value of the flat index of the center square
+        rng: The random number generator used for the bomb events
+        center_chance: float chance of the center being cleared after a move
+        board_chance: float chance of the whole board being cleared after a move
+
+    Returns:
+        The winning character, "tie" if the board is full, or "" if the game goes on
+    """
+    cells[index] = player
+    if rng.random() < center_chance:
+        cells[center] = " "
+    elif rng.random() < board_chance:
+        for i in range(len(cells)):
+            cells[i] = " "
+        return ""
+    for line in through[index]:
+        for i in line:
+            if cells[i] != player:
+                break
+        else:
+            return player
+    if " " not in cells:
+        return "tie"
+    return ""
+
+
+def _search(cells: list, size: int, player: str, deadline: float, seed: int, exploration: float,
+            center_chance: float, board_chance: float) -> tuple:
+    """Grows one search tree until the deadline passes.
+
+    The tree is open loop: a node stands for a sequence of moves rather than a
+    board, because bomb events can make the same moves lead to different
+    boards. Only the children that are legal on the sampled board are
+    considered at each step.
+
+    Args:
+        cells: A flat list of marks of the position to search
+        size: int value of the width of the board
+        player: A string containing the character that moves next
+        deadline: float time.time() at which the search stops, wherever and whenever it started
+        seed: int seed of the random number generator
+        exploration: float UCT exploration constant
+        center_chance: float chance of the center being cleared after a move
+        board_chance: float chance of the whole board being cleared after a move
+
+    Returns:
+        A tuple of a dict of root index to (visits, wins) and the number of playouts
+    """
+    rng = random.Random(seed)
+    through = _linesThrough(size)
+    center = (size // 2) * size + size // 2
+    max_plies = 4 * size * size
+    root = _Node()
+    root.visits = 1
+    playouts = 0
+    while True:
+        state = list(cells)
+        to_move = player
+        node = root
+        path = []
+        result = ""
+        plies = 0
+        while not result:
+            legal = [i for i, value in enumerate(state) if value == " "]
+            if not legal or plies >= max_plies:
+                result = "tie"
+                break
+            untried = [i for i in legal if i not in node.children]
+            if untried:
+                move = rng.choice(untried)
+                node.children[move] = _Node()
+            else:
+                log_visits = math.log(node.visits)
+                children = node.children
+                move = max(legal, key=lambda i: children[i].wins / children[i].visits +
+                           exploration * math.sqrt(log_visits / children[i].visits))
+            node = node.children[move]
+            path.append((node, to_move))
+            result = _play(state, move, to_move, through, center, rng, center_chance, board_chance)
+            to_move = _other(to_move)
+            plies += 1
+            if untried:
+                break
+        while not result:
+            legal = [i for i, value in enumerate(state) if value == " "]
+            if not legal or plies >= max_plies:
+                result = "tie"
+                break
+            result = _play(state, rng.choice(legal), to_move, through, center, rng, center_chance, board_chance)
+            to_move = _other(to_move)
+            plies += 1
+        root.visits += 1
+        for visited, mover in path:
+            visited.visits += 1
+            if result == mover:
+                visited.wins += 1.0
+            elif result == "tie":
+                visited.wins += 0.5
+        playouts += 1
+        if time.time() >= deadline:
+            break
+    stats = {index: (child.visits, child.wins) for index, child in root.children.items()}
+    return stats, playouts
+
+
+class MCTSPlayer:
+    """A simple class that searches Tic-Tac-Toe positions with root parallel MCTS.
+
+    Attributes:
+        workers: The number of processes that search each move, including the caller
+        time_budget: The number of seconds a call to bestMove may take
+        exploration: The UCT exploration constant
+        center_chance: The chance of the center being cleared after a move
+        board_chance: The chance of the whole board being cleared after a move
+        book: The OpeningBook checked before searching, or None
+        cache: The MoveCache checked before searching and filled after, or None
+        last_playouts: The number of playouts merged into the last result
+    """
+
+    def __init__(self, workers: int = None, time_budget: float = 1.0, exploration: float = math.sqrt(2),
+                 center_chance: float = CENTER_BOMB_CHANCE, board_chance: float = BOARD_BOMB_CHANCE,
+                 seed: int = None, book: OpeningBook = OPENING_BOOK, cache: MoveCache = MOVE_CACHE) -> None:
+        """Make a MCTSPlayer.
+
+        Args:
+            workers: int number of processes to search with, defaults to the number of cores
+            time_budget: float number of seconds a move may take
+            exploration: float UCT exploration constant
+            center_chance: float chance of the center being cleared after a move
+            board_chance: float chance of the whole board being cleared after a move
+            seed: int seed for reproducible searches, random if not given
+            book: OpeningBook checked before searching, the shared book by default
+            cache: MoveCache checked before searching and filled after, the shared cache by default
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.center_chance = center_chance
+        self.board_chance = board_chance
+        self.book = book
+        self.cache = cache
+        self.last_playouts = 0
+        self._rng = random.Random(seed)
+        self._pool = None
+
+    def bestMove(self, gameboard, player: str) -> tuple:
+        """Searches a position and picks the most visited move.
+
+        The calling process searches too, so a result is always ready when the
+        budget runs out; worker results that arrive late are left out.
+
+        Args:
+            gameboard: A BoardClass, or any object with a getBoard() method
+            player: A string containing the character that moves next
+
+        Returns:
+            A tuple of the best (x, y) move, or None if the board is full, and a
+            dict of (x, y) move to its merged number of visits, empty if the
+            move came from the book or the cache
+        """
+        start = time.time()
+        board = gameboard.getBoard()
+        size = len(board)
+        cells = _flatten(board)
+        if " " not in cells:
+            self.last_playouts = 0
+            return None, {}
+        chances = (self.center_chance, self.board_chance)
+        known = self.book.lookup(board, player, chances) if self.book is not None else None
+        if known is None and self.cache is not None:
+            known = self.cache.get(board, player, chances)
+        if known is not None:
+            self.last_playouts = 0
+            return known, {}
+        # Leave some of the budget for handing results back and merging them. The deadline is absolute, so
+        # a worker still busy with an overrunning search stops on time when it gets to this one.
+        deadline = start + self.time_budget * 0.9
+        args = (cells, size, player)
+        options = (self.exploration, self.center_chance, self.board_chance)
+        futures = []
+        if self.workers > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers - 1)
+            futures = [self._pool.submit(_search, *args, deadline, self._rng.getrandbits(32), *options)
+                       for _ in range(self.workers - 1)]
+        results = [_search(*args, deadline, self._rng.getrandbits(32), *options)]
+        if futures:
+            done, not_done = wait(futures, timeout=max(0.0, start + self.time_budget - time.time()))
+            for future in not_done:
+                future.cancel()
+            results += [future.result() for future in done if future.exception() is None]
+        visits = {}
+        self.last_playouts = 0
+        for stats, playouts in results:
+            self.last_playouts += playouts
+            for index, (count, _) in stats.items():
+                move = divmod(index, size)
+                visits[move] = visits.get(move, 0) + count
+        best = max(visits, key=visits.get)
+        if self.cache is not None:
+            self.cache.put(board, player, best, chances)
+        return best, visits
+
+    def close(self) -> None:
+        """Shuts down the worker processes.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def benchmark(size: int = 3, seconds: float = 1.0, workers: int = None) -> float:
+    """Measures the search speed on an empty board.
+
+    Args:
+        size: int value of the width of the board
+        seconds: float number of seconds to search for
+        workers: int number of processes to search with, defaults to the number of cores
+
+    Returns:
+        A float containing the number of playouts per second per core
+    """
+    class _EmptyBoard:
+        def getBoard(self) -> list:
+            return [[" " for _ in range(size)] for _ in range(size)]
+
+    with MCTSPlayer(workers=workers, time_budget=seconds, book=None, cache=None) as ai:
+        # The first search pays for starting the worker processes.
+        ai.bestMove(_EmptyBoard(), "X")
+        start = time.perf_counter()
+        ai.bestMove(_EmptyBoard(), "X")
+        elapsed = time.perf_counter() - start
+        return ai.last_playouts / elapsed / ai.workers
+
+
+if __name__ == "__main__":
+    for board_size in (3, 5, 7):
+        for core_count in sorted({1, os.cpu_count() or 1}):
+            speed = benchmark(board_size, 1.0, core_count)
+            print(f"{board_size}x{board_size} board, {core_count} core(s): {speed:.0f} playouts/s per core")
@@ -0,0 +1,282 @@
+"""Classes that remember the best moves of Tic-Tac-Toe positions for AI players.
+
+    When many AI games run on one host the same early positions get searched
+    over and over. The OpeningBook holds moves for those positions that were
+    searched ahead of time and is loaded once at startup. The MoveCache is a
+    bounded, thread safe LRU cache of position to best move that every room
+    handler in the process shares. Both key positions by the board state and
+    the player to move, folded over the 8 rotations and reflections of the
+    board so mirrored positions share one entry. Best moves depend on the
+    bomb chances they were searched under, so the cache keys them by the
+    chances too and the book only answers for the chances it was built with.
+
+    Typical usage example:
+
+    move = OPENING_BOOK.lookup(board, "O") or MOVE_CACHE.get(board, "O")
+"""
+
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from bombs import BOARD_BOMB_CHANCE, CENTER_BOMB_CHANCE
+
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.json")
+CACHE_SIZE = 65536
+DEFAULT_CHANCES = (CENTER_BOMB_CHANCE, BOARD_BOMB_CHANCE)
+_symmetry_table = {}
+
+
+def _symmetries(size: int) -> list:
+    """Gets the 8 rotations and reflections of a square board.
+
+    Args:
+        size: int value of the width of the board
+
+    Returns:
+        A list of tuples mapping every flat index of a transformed board to a flat index of the original
+    """
+    if size not in _symmetry_table:
+        last = size - 1
+        transforms = (lambda x, y: (x, y), lambda x, y: (y, last - x), lambda x, y: (last - x, last - y),
+                      lambda x, y: (last - y, x), lambda x, y: (x, last - y), lambda x, y: (last - x, y),
+                      lambda x, y: (y, x), lambda x, y: (last - y, last - x))
+        perms = set()
+        for transform in transforms:
+            perm = []
+            for x in range(size):
+                for y in range(size):
+                    a, b = transform(x, y)
+                    perm.append(a * size + b)
+            perms.add(tuple(perm))
+        _symmetry_table[size] = sorted(perms)
+    return _symmetry_table[size]
+
+
+def positionKey(board: list, player: str) -> tuple:
+    """Makes the key of a position that is the same for all its mirror images.
+
+    Args:
+        board: A 2-dimensional list as returned by BoardClass.getBoard()
+        player: A string containing the character that moves next
+
+    Returns:
+        A tuple of the key and the permutation that maps the key's board back to the given board
+    """
+    size = len(board)
+    cells = [value if value in ("X", "O") else " " for row in board for value in row]
+    best = None
+    best_perm = None
+    for perm in _symmetries(size):
+        state = "".join([cells[i] for i in perm])
+        if best is None or state < best:
+            best = state
+            best_perm = perm
+    return (size, best, player), best_perm
+
+
+class MoveCache:
+    """A simple class that caches the best move of positions in LRU order.
+
+    Attributes:
+        capacity: The largest number of positions kept
+        hits: The number of lookups that found a move
+        misses: The number of lookups that found nothing
+        evictions: The number of positions dropped to stay within capacity
+    """
+
+    def __init__(self, capacity: int = CACHE_SIZE) -> None:
+        """Make a MoveCache.
+
+        Args:
+            capacity: int largest number of positions kept
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._moves = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, board: list, player: str, chances: tuple = DEFAULT_CHANCES) -> tuple:
+        """Looks up the best move of a position.
+
+        Args:
+            board: A 2-dimensional list as returned by BoardClass.getBoard()
+            player: A string containing the character that moves next
+            chances: A tuple of the center and board bomb chances the move has to be searched under
+
+        Returns:
+            A tuple of the (x, y) move, or None if the position is not cached
+        """
+        key, perm = positionKey(board, player)
+        key += (chances,)
+        with self._lock:
+            index = self._moves.get(key)
+            if index is None:
+                self.misses += 1
+                return None
+            self._moves.move_to_end(key)
+            self.hits += 1
+        return divmod(perm[index], len(board))
+
+    def put(self, board: list, player: str, move: tuple, chances: tuple = DEFAULT_CHANCES) -> None:
+        """Stores the best move of a position, dropping the least recently used if full.
+
+        Args:
+            board: A 2-dimensional list as returned by BoardClass.getBoard()
+            player: A string containing the character that moves next
+            move: A tuple of the (x, y) best move
+            chances: A tuple of the center and board bomb chances the move was searched under
+        """
+        key, perm = positionKey(board, player)
+        key += (chances,)
+        index = perm.index(move[0] * len(board) + move[1])
+        with self._lock:
+            self._moves[key] = index
+            self._moves.move_to_end(key)
+            while len(self._moves) > self.capacity:
+                self._moves.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops every cached position and resets the counters.
+        """
+        with self._lock:
+            self._moves.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def getStats(self) -> dict:
+        """Gets the counters of the cache.
+
+        Returns:
+            A dict containing the size, capacity, hits, misses and evictions of the cache
+        """
+        with self._lock:
+            return {"size": len(self._moves), "capacity": self.capacity, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+
+class OpeningBook:
+    """A simple class that holds the best moves of early positions, searched ahead of time.
+
+    The book is only read after it is loaded, so it needs no locking.
+
+    Attributes:
+        moves: A dict of position key to the flat index of the best move on the key's board
+        chances: A tuple of the center and board bomb chances the moves were searched under
+    """
+
+    def __init__(self, moves: dict = None, chances: tuple = DEFAULT_CHANCES) -> None:
+        """Make an OpeningBook.
+
+        Args:
+            moves: A dict of position key to the flat index of the best move
+            chances: A tuple of the center and board bomb chances the moves were searched under
+        """
+        self.moves = moves or {}
+        self.chances = tuple(chances)
+
+    def lookup(self, board: list, player: str, chances: tuple = DEFAULT_CHANCES) -> tuple:
+        """Looks up the book move of a position.
+
+        Args:
+            board: A 2-dimensional list as returned by BoardClass.getBoard()
+            player: A string containing the character that moves next
+            chances: A tuple of the center and board bomb chances the move has to be searched under
+
+        Returns:
+            A tuple of the (x, y) move, or None if the position is not in the book or the chances differ
+        """
+        if not self.moves or tuple(chances) != self.chances:
+            return None
+        key, perm = positionKey(board, player)
+        index = self.moves.get(key)
+        return None if index is None else divmod(perm[index], len(board))
+
+    def build(self, ai, plies: int, size: int = 3) -> None:
+        """Searches every position up to a number of pieces and stores the best moves.
+
+        Args:
+            ai: An MCTSPlayer, whose bomb chances become the book's
+            plies: int largest number of pieces on the positions searched
+            size: int value of the width of the board
+        """
+        self.chances = (ai.center_chance, ai.board_chance)
+        class _Position:
+            def __init__(self, board: list) -> None:
+                self._board = board
+
+            def getBoard(self) -> list:
+                return self._board
+
+        level = {positionKey([[" "] * size for _ in range(size)], "X")[0]}
+        for depth in range(plies + 1):
+            player = "X" if depth % 2 == 0 else "O"
+            following = set()
+            for key in level:
+                cells = key[1]
+                board = [list(cells[x * size:(x + 1) * size]) for x in range(size)]
+                move, _ = ai.bestMove(_Position(board), player)
+                if move is None:
+                    continue
+                self.moves[key] = move[0] * size + move[1]
+                for index, value in enumerate(cells):
+                    if value == " ":
+                        child = cells[:index] + player + cells[index + 1:]
+                        child_board = [list(child[x * size:(x + 1) * size]) for x in range(size)]
+                        following.add(positionKey(child_board, "O" if player == "X" else "X")[0])
+            level = following
+
+    def save(self, path: str = BOOK_PATH) -> None:
+        """Writes the book to a JSON file.
+
+        Args:
+            path: str value of the path of the file
+        """
+        with open(path, "w", encoding="utf-8") as book:
+            json.dump({"chances": list(self.chances),
+                       "moves": {f"{size}|{cells}|{player}": index
+                                 for (size, cells, player), index in sorted(self.moves.items())}}, book, indent=0)
+
+    @classmethod
+    def load(cls, path: str = BOOK_PATH) -> "OpeningBook":
+        """Reads a book from a JSON file.
+
+        Args:
+            path: str value of the path of the file
+
+        Returns:
+            An OpeningBook, empty if the file does not exist
+        """
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as book:
+            entries = json.load(book)
+        moves = {}
+        for name, index in entries["moves"].items():
+            size, cells, player = name.split("|")
+            moves[(int(size), cells, player)] = index
+        return cls(moves, entries["chances"])
+
+
+OPENING_BOOK = OpeningBook.load()
+MOVE_CACHE = MoveCache()
+
+
+if __name__ == "__main__":
+    import sys
+    from mcts import MCTSPlayer
+
+    with MCTSPlayer(time_budget=2.0, book=None, cache=None) as searcher:
+        opening_book = OpeningBook()
+        opening_book.build(searcher, int(sys.argv[1]) if len(sys.argv) > 1 else 2)
+    opening_book.save()
+    print(f"Saved {len(opening_book.moves)} positions to {BOOK_PATH}")
@@ -0,0 +1,779 @@
+"""Classes that play many games of Tic-Tac-Toe over one connection.
+
+    Power users playing a simul and bot fleets playing hundreds of games used
+    to need a TCP connection per game. Here every game is a channel: each
+    frame is one line holding the channel id and a message, and the messages
+    are the same ones the two player windows send each other ("01",
+    "center11", "EVENT boom", "Play Again", "Fun Times"), plus
+    "OPEN <username>" to start a channel, "READY <username>" to accept it and
+    "ERROR <reason>" to close it.
+
+    The MultiplexHost serves any number of connections from one thread. It
+    queues frames per channel and handles them round robin, one frame per
+    channel per pass, so a busy channel or connection cannot starve the rest.
+    The host's own moves are searched in worker processes and handed back to
+    the loop when they are ready, so a search never holds up other channels.
+    The loop checks the opening book and the host process's move cache before
+    submitting a search and adds searched moves to the cache, so every
+    channel shares one cache whichever worker searched the move.
+    A lockstep client never has more than one frame waiting per channel, so a
+    channel is only closed when its queue overflows, and each connection gets
+    a byte budget.
+    Bomb events are decided by the host alone, from one BombScheduler for the
+    room that hands each game its GameBombs: every move of the client is answered with the "EVENT" it set off
+    before the host's own move. The MultiplexClient keeps one BoardClass per
+    channel up to date.
+
+    Typical usage example:
+
+    client = MultiplexClient("localhost", 5000, "Raymond")
+    channel = client.openChannel()
+    client.sendMove(channel, 1, 1)
+"""
+
+
+import os
+import random
+import selectors
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from gameboard import BoardClass
+import analytics
+import bombs
+import peerguard
+import profiler
+import statsapi
+from mcts import MCTSPlayer
+from movecache import MOVE_CACHE, OPENING_BOOK
+
+
+MAX_CHANNELS = 256
+MAX_QUEUE = 8
+MAX_LINE = 64
+BYTE_RATE = 64 * 1024.0
+BYTE_BURST = 256 * 1024
+READ_SIZE = 65536
+AI_BUDGET = 0.05
+_searcher = None
+
+
+def encodeFrame(channel: int, message: str) -> bytes:
+    """Makes the frame of a message on a channel.
+
+    Args:
+        channel: int id of the channel
+        message: str value of the message
+
+    Returns:
+        The bytes of the frame, newline included
+    """
+    return f"{channel} {message}\n".encode()
+
+
+def decodeFrame(line: bytes) -> tuple:
+    """Splits a frame into its channel id and message.
+
+    Args:
+        line: bytes of one frame without its newline
+
+    Returns:
+        A tuple of the int channel id and the str message
+
+    Raises:
+        PeerMisbehaving: The frame is not a channel id followed by a message
+    """
+    try:
+        channel, _, message = line.decode().partition(" ")
+        if not channel.isdigit() or not message:
+            raise ValueError
+        return int(channel), message
+    except ValueError:
+        raise peerguard.PeerMisbehaving(f"a malformed frame {line[:16]!r}") from None
+
+
+def applyMove(gameboard: BoardClass, message: str, player: str, player_username: str) -> None:
+    """Plays a move, bomb event included, on a game board.
+
+    Args:
+        gameboard: The BoardClass to play the move on
+        message: A string containing a move such as "01" or "center11"
+        player: A string containing character "X" or "O"
+        player_username: str value of the username of the player making the move
+    """
+    bomb, x, y = peerguard.parseMove(message)
+    gameboard.updateGameBoard(x, y, player, player_username)
+    if bomb == "center":
+        gameboard.bomb_center_board()
+    elif bomb == "boom":
+        gameboard.resetGameBoard()
+
+
+def _searchMove(board: list, player: str, center_chance: float, board_chance: float, time_budget: float) -> tuple:
+    """Searches the host's move in a worker process, keeping one MCTSPlayer per process.
+
+    The book and the cache are left to the host process, which shares them between every channel.
+
+    Args:
+        board: A 2-dimensional list as returned by BoardClass.getBoard()
+        player: A string containing the character that moves next
+        center_chance: float chance of the center being cleared after a move
+        board_chance: float chance of the whole board being cleared after a move
+        time_budget: float number of seconds the search may take
+
+    Returns:
+        A tuple of the (x, y) move
+    """
+    global _searcher
+    if _searcher is None:
+        _searcher = MCTSPlayer(workers=1, time_budget=time_budget, center_chance=center_chance,
+                               board_chance=board_chance, book=None, cache=None)
+
+    class _Position:
+        def getBoard(self) -> list:
+            return board
+
+    return _searcher.bestMove(_Position(), player)[0]
+
+
+def checkWinTie(gameboard: BoardClass, player: str) -> tuple:
+    """Checks whether the last move ended the game, updating the statistics like the player windows do.
+
+    Args:
+        gameboard: The BoardClass the move was played on
+        player: A string containing character "X" or "O" of the player who moved
+
+    Returns:
+        A tuple of bools indicating whether the player won and whether the game is a tie
+    """
+    win = bool(gameboard.isWinner(player))
+    tie = gameboard.boardIsFull()
+    if win and tie:
+        gameboard.decrementTies()
+        tie = False
+    if win or tie:
+        gameboard.updateGamesPlayed()
+    return win, tie
+
+
+class _Channel:
+    """A simple class that holds one game the host plays on a connection.
+
+    Attributes:
+        gameboard: The host's BoardClass of the game
+        bombs: The GameBombs of the current game
+        opponent: The username of the player on the other end
+        moves: A list of the moves of the current game
+        queue: A deque of messages waiting to be handled
+        finished: Boolean for if the game ended and a rematch answer is due
+        searching: Boolean for if the host's move is being searched
+    """
+
+    def __init__(self, username: str, opponent: str, game_bombs: bombs.GameBombs) -> None:
+        """Make a _Channel.
+
+        Args:
+            username: str value of the host's username
+            opponent: str value of the username of the player on the other end
+            game_bombs: The GameBombs of the first game
+        """
+        self.gameboard = BoardClass(username)
+        self.bombs = game_bombs
+        self.opponent = opponent
+        self.moves = []
+        self.queue = deque()
+        self.finished = False
+        self.searching = False
+
+
+class _Connection:
+    """A simple class that holds the buffers and channels of one connection to the host.
+
+    Attributes:
+        sock: The non-blocking socket of the connection
+        inbox: A bytearray of received bytes not yet split into frames
+        outbox: A bytearray of frames not yet sent
+        channels: A dict of channel id to _Channel
+        volume: TokenBucket limiting how many bytes the connection may send
+    """
+
+    def __init__(self, sock: socket.socket, byte_rate: float = BYTE_RATE, byte_burst: int = BYTE_BURST) -> None:
+        """Make a _Connection.
+
+        Args:
+            sock: The accepted socket
+            byte_rate: float number of bytes the connection may send every second
+            byte_burst: int number of bytes the connection may send back to back
+        """
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.channels = {}
+        self.volume = peerguard.TokenBucket(byte_rate, byte_burst)
+
+
+class MultiplexHost:
+    """A simple class that plays many multiplexed games as player2.
+
+    Attributes:
+        username: The host's username
+        chooseMove: A function taking a BoardClass and "O" and returning the host's (x, y) move, or None to
+            search moves in worker processes
+        archive: The path games are archived to, or None to not archive
+        scheduler: The BombScheduler of the room, which decides the bomb events of every game
+        listeners: A list of functions called with the record of every finished game
+        live_games: The number of channels open on all connections
+    """
+
+    def __init__(self, username: str, chooseMove=None, archive: str = analytics.ARCHIVE_PATH,
+                 seed: int = None, center_chance: float = bombs.CENTER_BOMB_CHANCE,
+                 board_chance: float = bombs.BOARD_BOMB_CHANCE, ai_workers: int = None,
+                 byte_rate: float = BYTE_RATE, byte_burst: int = BYTE_BURST) -> None:
+        """Make a MultiplexHost.
+
+        Args:
+            username: str value of the host's username
+            chooseMove: A quick function picking the host's moves on the loop, or None to search them with MCTS
+                in worker processes
+            archive: str value of the path games are archived to, or None to not archive
+            seed: int seed of the room's bomb events, random if not given
+            center_chance: float chance of the center being cleared after a move
+            board_chance: float chance of the whole board being cleared after a move that did not clear the center
+            ai_workers: int number of processes searching moves, defaults to the number of cores
+            byte_rate: float number of bytes each connection may send every second
+            byte_burst: int number of bytes each connection may send back to back
+        """
+        self.username = username
+        self.chooseMove = chooseMove
+        self._pool = None
+        if chooseMove is None:
+            self._pool = ProcessPoolExecutor(max_workers=ai_workers or os.cpu_count() or 1)
+        self.byte_rate = byte_rate
+        self.byte_burst = byte_burst
+        self.archive = archive
+        self.scheduler = bombs.BombScheduler(seed, center_chance, board_chance)
+        self._selector = selectors.DefaultSelector()
+        self.listeners = []
+        self.live_games = 0
+        self._ready = deque()
+        self._searched = deque()
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ, self._wakeup)
+
+    def serve(self, host: str, port: int) -> None:
+        """Accepts connections and plays their games until interrupted.
+
+        Args:
+            host: str value of the host to listen on
+            port: int value of the port to listen on
+        """
+        server = self.listen(host, port)
+        try:
+            while True:
+                self.poll(0 if self._ready else None)
+        finally:
+            self._selector.unregister(server)
+            server.close()
+
+    def listen(self, host: str, port: int) -> socket.socket:
+        """Starts accepting connections on the next calls to poll().
+
+        Args:
+            host: str value of the host to listen on
+            port: int value of the port to listen on, 0 for any free port
+
+        Returns:
+            The listening socket
+        """
+        server = socket.create_server((host, port))
+        server.setblocking(False)
+        self._selector.register(server, selectors.EVENT_READ)
+        return server
+
+    def close(self) -> None:
+        """Stops the worker processes searching moves.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._selector.unregister(self._wakeup)
+        self._wakeup.close()
+        self._waker.close()
+
+    @profiler.profiled
+    def poll(self, timeout: float = None) -> None:
+        """Does one round of reading, handling one frame per waiting channel and writing.
+
+        Args:
+            timeout: float number of seconds to wait for something to read, None to wait forever
+        """
+        for key, events in self._selector.select(timeout):
+            if key.data is None:
+                self._accept(key.fileobj)
+                continue
+            if key.data is self._wakeup:
+                try:
+                    self._wakeup.recv(READ_SIZE)
+                except BlockingIOError:
+                    pass
+                continue
+            connection = key.data
+            if events & selectors.EVENT_READ:
+                self._read(connection)
+            if events & selectors.EVENT_WRITE:
+                self._write(connection)
+        for _ in range(len(self._ready)):
+            connection, channel_id = self._ready.popleft()
+            channel = connection.channels.get(channel_id)
+            if channel is None or not channel.queue or channel.searching:
+                continue
+            self.handleMessage(connection, channel_id, channel.queue.popleft())
+            if channel.queue and not channel.searching and channel_id in connection.channels:
+                self._ready.append((connection, channel_id))
+            self._write(connection)
+        while self._searched:
+            connection, channel_id, channel, future = self._searched.popleft()
+            if connection.channels.get(channel_id) is not channel:
+                continue
+            channel.searching = False
+            try:
+                move = future.result()
+            except Exception as error:
+                self._closeChannel(connection, channel_id, f"the host could not move: {error}")
+            else:
+                MOVE_CACHE.put(channel.gameboard.getBoard(), "O", move, self._chances())
+                self._playReply(connection, channel_id, channel, move)
+                if channel.queue:
+                    self._ready.append((connection, channel_id))
+            self._write(connection)
+
+    def handleMessage(self, connection: _Connection, channel_id: int, message: str) -> None:
+        """Handles one message of an open channel.
+
+        Args:
+            connection: The _Connection the message came in on
+            channel_id: int id of the channel
+            message: str value of the message
+        """
+        channel = connection.channels[channel_id]
+        if message in peerguard.DECISIONS:
+            if not channel.finished:
+                self._closeChannel(connection, channel_id, "an answer while the game is on")
+            elif message == "Play Again":
+                channel.gameboard.resetGameBoard()
+                channel.bombs = self.scheduler.newGame()
+                channel.finished = False
+            else:
+                del connection.channels[channel_id]
+                self.live_games -= 1
+            return
+        try:
+            bomb, x, y = peerguard.parseMove(message)
+            if bomb:
+                raise peerguard.PeerMisbehaving("a bomb event from player1")
+            if channel.finished or not channel.gameboard.isValidMove(x, y, "X"):
+                raise peerguard.PeerMisbehaving(f"an illegal move {message!r}")
+        except peerguard.PeerMisbehaving as error:
+            self._closeChannel(connection, channel_id, str(error))
+            return
+        event = channel.bombs.nextEvent()
+        applyMove(channel.gameboard, event + message, "X", channel.opponent)
+        channel.moves.append(event + message)
+        connection.outbox += encodeFrame(channel_id, f"EVENT {event or 'none'}")
+        win, tie = checkWinTie(channel.gameboard, "X")
+        if win or tie:
+            self._finishGame(channel, channel.opponent if win else None)
+            return
+        if self._pool is None:
+            self._playReply(connection, channel_id, channel, self.chooseMove(channel.gameboard, "O"))
+            return
+        board = channel.gameboard.getBoard()
+        known = OPENING_BOOK.lookup(board, "O", self._chances())
+        if known is None:
+            known = MOVE_CACHE.get(board, "O", self._chances())
+        if known is not None:
+            self._playReply(connection, channel_id, channel, known)
+            return
+        channel.searching = True
+        future = self._pool.submit(_searchMove, board, "O", self.scheduler.center_chance,
+                                   self.scheduler.board_chance, AI_BUDGET)
+        future.add_done_callback(lambda done: self._searchDone(connection, channel_id, channel, done))
+
+    def _searchDone(self, connection: _Connection, channel_id: int, channel: _Channel, future) -> None:
+        """Hands a searched move back to the loop. Called on the thread that finished the future.
+
+        Args:
+            connection: The _Connection of the channel
+            channel_id: int id of the channel
+            channel: The _Channel the move was searched for
+            future: The finished Future of the move
+        """
+        self._searched.append((connection, channel_id, channel, future))
+        try:
+            self._waker.send(b"\0")
+        except OSError:
+            pass
+
+    def _chances(self) -> tuple:
+        """Gets the bomb chances of the room, as the book and the cache key moves by them.
+
+        Returns:
+            A tuple of the center and board chances
+        """
+        return self.scheduler.center_chance, self.scheduler.board_chance
+
+    def _playReply(self, connection: _Connection, channel_id: int, channel: _Channel, move: tuple) -> None:
+        """Plays the host's move on a channel and sends it.
+
+        Args:
+            connection: The _Connection of the channel
+            channel_id: int id of the channel
+            channel: The _Channel to move on
+            move: A tuple of the host's (x, y) move
+        """
+        x, y = move
+        reply = channel.bombs.nextEvent() + str(x) + str(y)
+        applyMove(channel.gameboard, reply, "O", self.username)
+        channel.moves.append(reply)
+        connection.outbox += encodeFrame(channel_id, reply)
+        win, tie = checkWinTie(channel.gameboard, "O")
+        if win or tie:
+            self._finishGame(channel, self.username if win else None)
+
+    def countGames(self) -> int:
+        """Gets the number of games being played.
+
+        Returns:
+            An int containing the number of open channels
+        """
+        return self.live_games
+
+    def _finishGame(self, channel: _Channel, winner: str) -> None:
+        """Archives a finished game, tells the listeners and waits for the rematch answer.
+
+        Args:
+            channel: The _Channel whose game ended
+            winner: str value of the username of the winner, or None for a tie
+        """
+        record = analytics.makeRecord(channel.opponent, self.username, channel.moves, winner, self.scheduler.seed,
+                                      channel.bombs.game)
+        if self.archive is not None:
+            analytics.appendRecord(record, self.archive)
+        for listener in self.listeners:
+            listener(record)
+        channel.moves = []
+        channel.finished = True
+
+    def _accept(self, server: socket.socket) -> None:
+        """Accepts a new connection.
+
+        Args:
+            server: The listening socket
+        """
+        try:
+            sock, _ = server.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        self._selector.register(sock, selectors.EVENT_READ, _Connection(sock, self.byte_rate, self.byte_burst))
+
+    def _read(self, connection: _Connection) -> None:
+        """Reads what a connection sent and queues its frames on their channels.
+
+        Args:
+            connection: The _Connection that is ready to read
+        """
+        try:
+            data = connection.sock.recv(READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(connection)
+            return
+        if not connection.volume.consume(len(data)):
+            self._close(connection)
+            return
+        connection.inbox += data
+        *lines, rest = connection.inbox.split(b"\n")
+        if len(rest) > MAX_LINE:
+            self._close(connection)
+            return
+        connection.inbox = bytearray(rest)
+        for line in lines:
+            try:
+                channel_id, message = decodeFrame(bytes(line))
+            except peerguard.PeerMisbehaving:
+                self._close(connection)
+                return
+            channel = connection.channels.get(channel_id)
+            if channel is None:
+                self._openChannel(connection, channel_id, message)
+            elif len(channel.queue) >= MAX_QUEUE:
+                self._closeChannel(connection, channel_id, "too many messages")
+            else:
+                if not channel.queue and not channel.searching:
+                    self._ready.append((connection, channel_id))
+                channel.queue.append(message)
+        self._write(connection)
+
+    def _openChannel(self, connection: _Connection, channel_id: int, message: str) -> None:
+        """Opens a channel if the message asks for it.
+
+        Args:
+            connection: The _Connection the message came in on
+            channel_id: int id of the channel
+            message: str value of the message
+        """
+        command, _, opponent = message.partition(" ")
+        try:
+            if command != "OPEN":
+                raise peerguard.PeerMisbehaving("a message on a channel that is not open")
+            if len(connection.channels) >= MAX_CHANNELS:
+                raise peerguard.PeerMisbehaving("too many channels")
+            peerguard.checkUsername(opponent)
+        except peerguard.PeerMisbehaving as error:
+            connection.outbox += encodeFrame(channel_id, f"ERROR {error}")
+            return
+        connection.channels[channel_id] = _Channel(self.username, opponent, self.scheduler.newGame())
+        self.live_games += 1
+        connection.outbox += encodeFrame(channel_id, f"READY {self.username}")
+
+    def _closeChannel(self, connection: _Connection, channel_id: int, reason: str) -> None:
+        """Closes a channel that misbehaved.
+
+        Args:
+            connection: The _Connection of the channel
+            channel_id: int id of the channel
+            reason: A string describing what went wrong
+        """
+        if connection.channels.pop(channel_id, None) is not None:
+            self.live_games -= 1
+        connection.outbox += encodeFrame(channel_id, f"ERROR {reason}")
+
+    def _write(self, connection: _Connection) -> None:
+        """Sends as much of a connection's outbox as the socket takes.
+
+        Args:
+            connection: The _Connection to write to
+        """
+        if connection.outbox:
+            try:
+                sent = connection.sock.send(connection.outbox)
+                del connection.outbox[:sent]
+            except BlockingIOError:
+                pass
+            except OSError:
+                self._close(connection)
+                return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if connection.outbox else 0)
+        try:
+            self._selector.modify(connection.sock, events, connection)
+        except (KeyError, ValueError):
+            pass
+
+    def _close(self, connection: _Connection) -> None:
+        """Closes a connection and every channel on it.
+
+        Args:
+            connection: The _Connection to close
+        """
+        self.live_games -= len(connection.channels)
+        connection.channels.clear()
+        try:
+            self._selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+        connection.sock.close()
+
+
+class MultiplexClient:
+    """A simple class that plays many games as player1 over one connection.
+
+    Attributes:
+        username: The user's username
+        client: The socket connected to the host
+        gameboards: A dict of channel id to the BoardClass of that game
+        opponents: A dict of channel id to the username of the host
+    """
+
+    def __init__(self, host: str, port: int, username: str) -> None:
+        """Make a MultiplexClient.
+
+        Args:
+            host: str value of the host to connect to
+            port: int value of the port to connect to
+            username: str value of the user's alphanumeric username
+        """
+        self.username = username
+        self.client = socket.create_connection((host, port))
+        self.gameboards = {}
+        self.opponents = {}
+        self._next_channel = 0
+        self._inbox = bytearray()
+
+    def openChannel(self) -> int:
+        """Starts a new game on a new channel.
+
+        Returns:
+            An int containing the id of the channel
+        """
+        channel = self._next_channel
+        self._next_channel += 1
+        self.gameboards[channel] = BoardClass(self.username)
+        self.client.sendall(encodeFrame(channel, f"OPEN {self.username}"))
+        return channel
+
+    def sendMove(self, channel: int, x: int, y: int) -> None:
+        """Plays the user's move on a channel. Whether it ended the game is known once its EVENT is received.
+
+        Args:
+            channel: int id of the channel
+            x: int value of x-position of the move
+            y: int value of y-position of the move
+        """
+        self.gameboards[channel].updateGameBoard(x, y, "X", self.username)
+        self.client.sendall(encodeFrame(channel, str(x) + str(y)))
+
+    def sendDecision(self, channel: int, play_again: bool) -> None:
+        """Answers the rematch question of a finished game.
+
+        Args:
+            channel: int id of the channel
+            play_again: bool containing whether or not the user wants to play again
+        """
+        if play_again:
+            self.gameboards[channel].resetGameBoard()
+            self.client.sendall(encodeFrame(channel, "Play Again"))
+        else:
+            self.client.sendall(encodeFrame(channel, "Fun Times"))
+            self.gameboards.pop(channel, None)
+
+    def receive(self) -> list:
+        """Waits for the host and plays the bomb events and host's moves on their channels.
+
+        Returns:
+            A list of tuples of channel id, message and whether or not the message ended the game
+        """
+        while b"\n" not in self._inbox:
+            data = self.client.recv(READ_SIZE)
+            if not data:
+                raise ConnectionError("the connection was closed")
+            self._inbox += data
+        *lines, rest = self._inbox.split(b"\n")
+        self._inbox = bytearray(rest)
+        received = []
+        for line in lines:
+            channel, message = decodeFrame(bytes(line))
+            ended = False
+            if message.startswith("READY "):
+                self.opponents[channel] = message[6:]
+            elif message.startswith("ERROR "):
+                self.gameboards.pop(channel, None)
+            elif message.startswith("EVENT ") and channel in self.gameboards:
+                gameboard = self.gameboards[channel]
+                if message == "EVENT center":
+                    gameboard.bomb_center_board()
+                elif message == "EVENT boom":
+                    gameboard.resetGameBoard()
+                ended = any(checkWinTie(gameboard, "X"))
+            elif channel in self.gameboards:
+                applyMove(self.gameboards[channel], message, "O", self.opponents.get(channel))
+                ended = any(checkWinTie(self.gameboards[channel], "O"))
+            received.append((channel, message, ended))
+        return received
+
+    def close(self) -> None:
+        """Closes the connection.
+        """
+        self.client.close()
+
+
+def benchmark(games: int = 200, channels: int = 20, chooseMove=None, seed: int = 0) -> float:
+    """Plays random games against a host over loopback, checking both ends stay in step.
+
+    The client picks its moves from its own BoardClass of each channel, so a
+    host and client that disagree about a board, a bomb event included, end in
+    an illegal move and the host closing the channel.
+
+    Args:
+        games: int number of games to play
+        channels: int number of games played at the same time
+        chooseMove: A function picking the host's moves, or None to search them with MCTS
+        seed: int seed of the bomb events and the client's moves
+
+    Returns:
+        A float containing the number of games finished per second
+
+    Raises:
+        RuntimeError: The host closed a channel
+    """
+    host = MultiplexHost("Host", chooseMove, archive=None, seed=seed)
+    server = host.listen("127.0.0.1", 0)
+    stopping = threading.Event()
+
+    def loop() -> None:
+        while not stopping.is_set():
+            host.poll(0 if host._ready else 0.05)
+
+    thread = threading.Thread(target=loop, name="multiplex", daemon=True)
+    thread.start()
+    client = MultiplexClient(*server.getsockname()[:2], "Bench")
+    rng = random.Random(seed)
+
+    def move(channel: int) -> None:
+        board = client.gameboards[channel].getBoard()
+        client.sendMove(channel, *rng.choice([(x, y) for x in range(3) for y in range(3)
+                                              if board[x][y] not in ("X", "O")]))
+
+    start = time.perf_counter()
+    try:
+        started = min(games, channels)
+        finished = 0
+        for _ in range(started):
+            client.openChannel()
+        while finished < games:
+            for channel, message, ended in client.receive():
+                if message.startswith("ERROR "):
+                    raise RuntimeError(f"channel {channel} was closed: {message[6:]}")
+                if message.startswith("READY "):
+                    move(channel)
+                elif ended:
+                    finished += 1
+                    again = started < games
+                    started += again
+                    client.sendDecision(channel, again)
+                    if again:
+                        move(channel)
+                elif not message.startswith("EVENT "):
+                    move(channel)
+        return games / (time.perf_counter() - start)
+    finally:
+        stopping.set()
+        thread.join()
+        client.close()
+        server.close()
+        host.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        first_empty = lambda gameboard, player: next((x, y) for x in range(3) for y in range(3)
+                                                     if gameboard.getBoard()[x][y] not in ("X", "O"))
+        print(f"MCTS host: {benchmark():.0f} games/s")
+        print(f"First empty square host: {benchmark(chooseMove=first_empty):.0f} games/s")
+        sys.exit()
+    profiler.installSignalHandler()
+    multiplex_host = MultiplexHost(sys.argv[3] if len(sys.argv) > 3 else "Host")
+    stats_store = statsapi.StatsStore(liveGames=multiplex_host.countGames)
+    multiplex_host.listeners.append(stats_store.recordGame)
+    statsapi.serveStats(stats_store)
+    try:
+        multiplex_host.serve(sys.argv[1], int(sys.argv[2]))
+    finally:
+        multiplex_host.close()
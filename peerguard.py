@@ -0,0 +1,236 @@
+"""Classes that protect the host from a misbehaving or flooding peer.
+
+    Everything player1 sends used to be trusted: a garbled move crashed on
+    int(p1_move[0]) and a peer could send frames faster than the host handles
+    them. Every message is framed by a newline, since TCP may split one send
+    over several reads or merge several sends into one, and a MessageReader
+    buffers reads until a whole message is in. The ConnectionGuard reads every
+    message through two token buckets, one for the number of messages and one
+    for the number of bytes, and parseMove
+    checks that a move is well formed before the host touches its BoardClass.
+    Anything that fails raises PeerMisbehaving so the host can cut the peer off
+    without doing any more work for it.
+
+    Typical usage example:
+
+    guard = ConnectionGuard()
+    bomb, x, y = parseMove(guard.receive(connection))
+"""
+
+
+import re
+import time
+
+
+MESSAGE_RATE = 5.0
+MESSAGE_BURST = 10
+BYTE_RATE = 512.0
+BYTE_BURST = 2048
+FRAME_SIZE = 1024
+MAX_USERNAME = 32
+DECISIONS = ("Play Again", "Fun Times")
+_MOVE = re.compile(r"(center|boom)?([0-2])([0-2])")
+
+
+class PeerMisbehaving(Exception):
+    """Raised when a peer sends something the host will not accept.
+    """
+
+
+class TokenBucket:
+    """A simple class that limits how fast something may happen.
+
+    Attributes:
+        rate: The number of tokens added back every second
+        capacity: The largest number of tokens the bucket holds
+        tokens: The number of tokens left
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Make a TokenBucket, starting full.
+
+        Args:
+            rate: float number of tokens added back every second
+            capacity: float largest number of tokens the bucket holds
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._last = time.monotonic()
+
+    def consume(self, amount: float = 1) -> bool:
+        """Takes tokens out of the bucket if there are enough.
+
+        Args:
+            amount: float number of tokens to take
+
+        Returns:
+            A bool value indicating if the tokens were taken
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+
+def encodeMessage(message: str) -> bytes:
+    """Makes the frame of a message.
+
+    Args:
+        message: str value of the message, without newlines
+
+    Returns:
+        The bytes of the message followed by a newline
+    """
+    return (message + "\n").encode()
+
+
+class MessageReader:
+    """A simple class that reads newline framed messages from a socket.
+    """
+
+    def __init__(self) -> None:
+        """Make a MessageReader.
+        """
+        self._buffer = bytearray()
+
+    def receive(self, connection) -> str:
+        """Receives one message, reading until all of it is in.
+
+        Args:
+            connection: A connected socket
+
+        Returns:
+            A string containing the message without its newline
+
+        Raises:
+            ConnectionError: The peer hung up
+            PeerMisbehaving: The peer sent a message that is too long or not text
+        """
+        while b"\n" not in self._buffer:
+            if len(self._buffer) > FRAME_SIZE:
+                raise PeerMisbehaving("a message that is too long")
+            data = connection.recv(FRAME_SIZE)
+            if not data:
+                raise ConnectionError("the connection was closed")
+            self._received(len(data))
+            self._buffer += data
+        line, _, rest = self._buffer.partition(b"\n")
+        self._buffer = bytearray(rest)
+        if len(line) > FRAME_SIZE:
+            raise PeerMisbehaving("a message that is too long")
+        self._message()
+        try:
+            return line.decode()
+        except UnicodeDecodeError:
+            raise PeerMisbehaving("a message that is not text") from None
+
+    def _received(self, size: int) -> None:
+        """Called with the size of every read.
+
+        Args:
+            size: int number of bytes read
+        """
+
+    def _message(self) -> None:
+        """Called for every whole message read.
+        """
+
+
+class ConnectionGuard(MessageReader):
+    """A simple class that reads messages from one peer within its rate limits.
+
+    Attributes:
+        messages: TokenBucket limiting the number of messages
+        volume: TokenBucket limiting the number of bytes
+    """
+
+    def __init__(self, message_rate: float = MESSAGE_RATE, message_burst: int = MESSAGE_BURST,
+                 byte_rate: float = BYTE_RATE, byte_burst: int = BYTE_BURST) -> None:
+        """Make a ConnectionGuard.
+
+        Args:
+            message_rate: float number of frames allowed every second
+            message_burst: int number of frames allowed back to back
+            byte_rate: float number of bytes allowed every second
+            byte_burst: int number of bytes allowed back to back
+        """
+        super().__init__()
+        self.messages = TokenBucket(message_rate, message_burst)
+        self.volume = TokenBucket(byte_rate, byte_burst)
+
+    def _received(self, size: int) -> None:
+        """Counts a read against the byte limit.
+
+        Args:
+            size: int number of bytes read
+
+        Raises:
+            PeerMisbehaving: The peer sent too much data
+        """
+        if not self.volume.consume(size):
+            raise PeerMisbehaving("too much data")
+
+    def _message(self) -> None:
+        """Counts a message against the message limit.
+
+        Raises:
+            PeerMisbehaving: The peer sent too many messages
+        """
+        if not self.messages.consume(1):
+            raise PeerMisbehaving("too many messages")
+
+
+def parseMove(message: str) -> tuple:
+    """Splits a move as sent over the socket into its parts.
+
+    Args:
+        message: A string such as "01", "center11" or "boom20"
+
+    Returns:
+        A tuple of the bomb event ("", "center" or "boom") and the x and y of the move
+
+    Raises:
+        PeerMisbehaving: The message is not exactly one move
+    """
+    match = _MOVE.fullmatch(message)
+    if match is None:
+        raise PeerMisbehaving(f"a malformed move {message[:16]!r}")
+    return match.group(1) or "", int(match.group(2)), int(match.group(3))
+
+
+def checkUsername(message: str) -> str:
+    """Checks a username sent by a peer.
+
+    Args:
+        message: A string containing the username
+
+    Returns:
+        The username if it is alphanumeric and not too long
+
+    Raises:
+        PeerMisbehaving: The username is not acceptable
+    """
+    if not message.isalnum() or len(message) > MAX_USERNAME:
+        raise PeerMisbehaving(f"an invalid username {message[:16]!r}")
+    return message
+
+
+def checkDecision(message: str) -> str:
+    """Checks the answer a peer sends after a game ends.
+
+    Args:
+        message: A string containing the answer
+
+    Returns:
+        The answer if it is "Play Again" or "Fun Times"
+
+    Raises:
+        PeerMisbehaving: The answer is neither
+    """
+    if message not in DECISIONS:
+        raise PeerMisbehaving(f"an unexpected answer {message[:16]!r}")
+    return message
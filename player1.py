@@ -18,7 +18,10 @@ import sys
 import tkinter as tk
 from tkinter import simpledialog
 from tkinter import messagebox
-import random
+import peerguard
+import session
+import profiler
+import time
 
 
 class PlayerOne:
@@ -38,6 +41,8 @@ class PlayerOne:
         your_turn: A message saying it is the user's turn
         opp_turn: A message saying it is the opponent's turn
         continuePlaying: A string containing whether or not the user wants to continue playing
+        token: The resume token from player2 used to reconnect after the connection drops
+        reader: MessageReader splitting what player2 sends into messages
     """
 
     def __init__(self) -> None:
@@ -63,6 +68,8 @@ class PlayerOne:
         self.try_again = tk.StringVar()
         self.try_again.set("@")
         self.current_player = None
+        self.token = None
+        self.reader = peerguard.MessageReader()
 
     def windowSetUp(self) -> None:
         """Sets up TKinter window.
@@ -83,6 +90,7 @@ class PlayerOne:
             try:
                 self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 self.client.connect((self.host.get(), self.port.get()))
+                session.keepAlive(self.client)
                 break
             except (ConnectionRefusedError, OverflowError, socket.error):
                 while self.try_again.get()[0].upper() != "Y" and self.try_again.get()[0].upper() != "N":
@@ -114,7 +122,8 @@ class PlayerOne:
     def confirmInstructions(self) -> None:
         """Makes sure user understands Tic-Tac-Toe.
         """
-        self.p2_username.set(self.client.recv(1024).decode())
+        p2_username, self.token = session.decodeGreeting(self.reader.receive(self.client))
+        self.p2_username.set(p2_username)
         tk.messagebox.showinfo(title="Tic-Tac-Toe: Instructions", message=f"{self.p1_username.get()}, Tic Tac Toe "
                                                                                           "is a game of Xs and Os "
                                                                                           "where we will be marking "
@@ -131,7 +140,119 @@ class PlayerOne:
         Args:
             user_entry: A string containing whatever the user wants to send over
         """
-        self.client.sendall(user_entry.encode())
+        try:
+            self.client.sendall(peerguard.encodeMessage(user_entry))
+        except OSError as error:
+            if not self.resumeSession(resend=user_entry):
+                self.lostConnection(str(error))
+
+    def receiveInformation(self) -> str:
+        """Receives information through sockets, resuming the session if the connection drops.
+
+        Returns:
+            A string containing what player2 sent, or None if the game was picked back up after a resume
+        """
+        try:
+            return self.reader.receive(self.client)
+        except (peerguard.PeerMisbehaving, OSError) as error:
+            reason = str(error)
+        if not self.resumeSession():
+            self.lostConnection(reason)
+        return None
+
+    def resumeSession(self, resend: str = None) -> bool:
+        """Reconnects to player2 with the resume token and picks the game back up.
+
+        Args:
+            resend: A string containing a message that failed to send, or None
+
+        Returns:
+            A bool value indicating if the session was resumed within the grace period
+        """
+        if self.token is None:
+            return False
+        self.client.close()
+        deadline = time.monotonic() + session.RESUME_GRACE
+        while time.monotonic() < deadline:
+            try:
+                client = socket.create_connection((self.host.get(), self.port.get()),
+                                                  timeout=max(0.0, deadline - time.monotonic()))
+                client.sendall(peerguard.encodeMessage(session.encodeResume(self.token)))
+                reader = peerguard.MessageReader()
+                snapshot, phase = session.decodeSnapshot(reader.receive(client))
+                client.settimeout(None)
+            except (peerguard.PeerMisbehaving, OSError, ValueError):
+                self.window.update_idletasks()
+                time.sleep(session.RETRY_DELAY)
+                continue
+            self.client, self.reader = session.keepAlive(client), reader
+            if resend is not None:
+                # player2 never got the message, so it is one step behind the board on screen.
+                self.client.sendall(peerguard.encodeMessage(resend))
+            else:
+                self.restoreSnapshot(snapshot, phase)
+            return True
+        return False
+
+    def restoreSnapshot(self, snapshot: dict, phase: str) -> None:
+        """Redraws the game from player2's snapshot and hands the turn back to whoever has it.
+
+        Args:
+            snapshot: A snapshot dict from session.decodeSnapshot()
+            phase: str value of "X" if the user has to move, "O" if player2 has to move or "R" if the user has to
+                answer the rematch question
+        """
+        decided = self.p1_gameboard.getGames() == snapshot["games"]
+        self.p1_gameboard.loadSnapshot(session.mirrorSnapshot(snapshot))
+        board = self.p1_gameboard.getBoard()
+        if phase != "R" and (self.p1_gameboard.hasLine("X") or self.p1_gameboard.hasLine("O") or
+                             self.p1_gameboard.isFull()):
+            # The game on the board is over whatever the phase says, so player2 is waiting for the answer.
+            phase, decided = "R", False
+        for x in range(3):
+            for y in range(3):
+                self.entire_board[x][y]['text'] = board[x][y].strip()
+                self.entire_board[x][y]['state'] = "disabled" if board[x][y] in ("X", "O") else "normal"
+        if hasattr(self, "opp_turn"):
+            self.opp_turn.destroy()
+        self.your_turn.destroy()
+        if phase == "O":
+            self.opp_turn = tk.Label(text=f'It is currently {self.p2_username.get()}\'s turn', bg='blue', fg='white')
+            self.opp_turn.grid(row=1, column=4)
+            self.opp_turn.update()
+            self.receiveMove()
+            return
+        self.your_turn = tk.Label(text=f'It is currently {self.p1_username.get()}\'s turn', bg='blue', fg='white')
+        self.your_turn.grid(row=1, column=4)
+        self.your_turn.update()
+        if phase == "R":
+            if decided:
+                self.sendInformation("Play Again" if self.continuePlaying == "yes" else "Fun Times")
+            else:
+                self.askRematch()
+            if self.continuePlaying == "yes":
+                self.resetGameboards()
+            else:
+                self.your_turn.destroy()
+                for x in range(3):
+                    for y in range(3):
+                        self.entire_board[x][y]['text'] = ""
+                        self.entire_board[x][y]['state'] = "disabled"
+
+    def lostConnection(self, reason: str) -> None:
+        """Tells the user the connection to player2 is gone and stops the game.
+
+        Args:
+            reason: A string describing what went wrong
+        """
+        tk.messagebox.showerror(title="Tic-Tac-Toe: Connection Lost",
+                                message=f"The connection to player2 was lost: {reason}.")
+        if not hasattr(self, "entire_board"):
+            self.window.destroy()
+            sys.exit()
+        for x in range(3):
+            for y in range(3):
+                self.entire_board[x][y]['state'] = "disabled"
 
     def createGameBoard(self) -> None:
         """Creates board of interactive buttons.
@@ -147,6 +268,7 @@ class PlayerOne:
         self.your_turn = tk.Label(text=f'It is currently {self.p1_username.get()}\'s turn', bg='blue', fg='white')
         self.your_turn.grid(row=1, column=4)
 
+    @profiler.profiled
     def initiateGame(self, x: int, y: int, player: str) -> None:
         """Places users piece on board, handles if a games end, and calls receiveMove() function.
 
@@ -160,11 +282,13 @@ class PlayerOne:
         self.entire_board[x][y]['state'] = 'disabled'
         self.entire_board[x][y].update()
         p1_move = str(x) + str(y)
-        random_bomb = self.random_bomb()
-        if type(random_bomb) == str:
-            self.sendInformation(random_bomb + p1_move)
-        else:
-            self.sendInformation(p1_move)
+        self.sendInformation(p1_move)
+        # player2 decides the bomb event of every move and answers with it straight away.
+        event = self.receiveInformation()
+        if event is None:
+            return
+        self.playBomb(event[6:])
+        self.showBomb(event[6:])
         game_ended = self.checkWinTie(player)
         if game_ended:
             if self.continuePlaying == "yes":
@@ -184,26 +308,20 @@ class PlayerOne:
             self.opp_turn.update()
             self.receiveMove()
 
+    @profiler.profiled
     def receiveMove(self) -> None:
         """Places opponents piece on board, handles if a games end
         """
-        p2_move = self.client.recv(1024).decode()
-        if "center" in p2_move:
-            self.p1_gameboard.updateGameBoard(int(p2_move[-2]), int(p2_move[-1]), "O", self.p1_username.get())
-            self.entire_board[int(p2_move[-2])][int(p2_move[-1])]['text'] = 'O'
-            self.entire_board[int(p2_move[-2])][int(p2_move[-1])]['state'] = 'disabled'
-            self.entire_board[int(p2_move[-2])][int(p2_move[-1])].update()
-            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="The center of the board was cleared!")
-            self.entire_board[1][1]['text'] = ""
-            self.entire_board[1][1]['state'] = "normal"
-        elif "boom" in p2_move:
-            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="BOOM! The entire board was cleared")
-            self.resetGameboards()
-        else:
-            self.p1_gameboard.updateGameBoard(int(p2_move[0]), int(p2_move[1]), "O", self.p2_username.get())
-            self.entire_board[int(p2_move[0])][int(p2_move[1])].config(text="O")
-            self.entire_board[int(p2_move[0])][int(p2_move[1])]['state'] = 'disabled'
-            self.entire_board[int(p2_move[0])][int(p2_move[1])].update()
+        p2_move = self.receiveInformation()
+        if p2_move is None:
+            return
+        x, y = int(p2_move[-2]), int(p2_move[-1])
+        self.p1_gameboard.updateGameBoard(x, y, "O", self.p2_username.get())
+        self.entire_board[x][y].config(text="O")
+        self.entire_board[x][y]['state'] = 'disabled'
+        self.entire_board[x][y].update()
+        self.playBomb(p2_move[:-2])
+        self.showBomb(p2_move[:-2])
         self.opp_turn.destroy()
         self.your_turn = tk.Label(text=f'It is currently {self.p1_username.get()}\'s turn', bg='blue', fg='white')
         self.your_turn.grid(row=1, column=4)
@@ -221,6 +339,7 @@ class PlayerOne:
                         self.entire_board[x][y]['state'] = "disabled"
                         self.entire_board[x][y].update()
 
+    @profiler.profiled
     def checkWinTie(self, player: str) -> bool:
         """Checks whether there was a winner from the last turn.
 
@@ -254,6 +373,7 @@ class PlayerOne:
                 self.entire_board[x][y]['text'] = ""
                 self.entire_board[x][y]['state'] = "normal"
 
+    @profiler.profiled
     def afterGame(self, win: bool, tie: bool) -> None:
         """Deals with whatever decision user decides to do after a game ends.
 
@@ -266,6 +386,11 @@ class PlayerOne:
             tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Results", message=f"Game Over! {self.p1_gameboard.getLastPlayer()} has won the game!")
         elif tie:
             tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Results", message=f"Game Over! The game against {self.p2_username.get()} has ended in a tie")
+        self.askRematch()
+
+    def askRematch(self) -> None:
+        """Asks the user for a rematch, tells player2 and shows the statistics if the user is done.
+        """
         self.continuePlaying = tk.messagebox.askquestion(title="Tic-Tac-Toe: Rematch?",
                                                          message="Would you like to play again?", icon='question')
         if self.continuePlaying == 'yes':
@@ -300,19 +425,29 @@ class PlayerOne:
                                             text=f"{self.p1_gameboard.getGames()}", bg="blue", fg="white")
             gameStatsGames1.grid(row=10, column=1)
 
-    def random_bomb(self):
-        rand = random.randrange(1, 10)
-        if rand == 1:
+    def playBomb(self, event: str) -> None:
+        """Plays a bomb event decided by player2 on the game board and the buttons.
+
+        Args:
+            event: A string containing "center", "boom", or anything else if nothing happens
+        """
+        if event == "center":
+            self.p1_gameboard.bomb_center_board()
             self.entire_board[1][1]['text'] = ""
             self.entire_board[1][1]['state'] = "normal"
-            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="The center of the board was cleared!")
-            return "center"
-        rand2 = random.randrange(1, 100)
-        if rand2 == 1:
+        elif event == "boom":
             self.resetGameboards()
+
+    def showBomb(self, event: str) -> None:
+        """Tells the user about a bomb event.
+
+        Args:
+            event: A string containing "center", "boom", or anything else if nothing happens
+        """
+        if event == "center":
+            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="The center of the board was cleared!")
+        elif event == "boom":
             tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="BOOM! The entire board was cleared")
-            return "boom"
-        return False
 
     def handle_game_ended(self, game_ended):
         if game_ended:
@@ -343,4 +478,5 @@ class PlayerOne:
 
 
 if __name__ == "__main__":
+    profiler.installSignalHandler()
     player_one = PlayerOne()
@@ -18,7 +18,13 @@ import sys
 import tkinter as tk
 from tkinter import simpledialog
 from tkinter import messagebox
-import random
+import analytics
+import bombs
+import peerguard
+import session
+import statsapi
+import profiler
+import time
 
 
 class PlayerTwo:
@@ -39,20 +45,41 @@ class PlayerTwo:
         your_turn: A message saying it is the user's turn
         opp_turn: A message saying it is the opponent's turn
         p1_decision: A string containing whether or not the user wants to continue playing
+        game_moves: A list of the moves of the current game as they were sent over the socket
+        guard: ConnectionGuard rate limiting what player1 sends
+        token: The resume token player1 reconnects with after its connection drops
+        phase: "X" while waiting for player1's move, "O" during the user's turn or "R" while waiting for player1's
+            rematch answer
+        dropped: Boolean for if player1 was cut off for good
+        scheduler: BombScheduler of the room, drawing the bomb events of every game from its seed
+        bombs: GameBombs deciding the bomb events of both players in the current game
+        stats: StatsStore of every finished game, served over HTTP on statsapi.STATS_PORT
     """
-    def __init__(self) -> None:
+    def __init__(self, seed: int = None, center_chance: float = bombs.CENTER_BOMB_CHANCE,
+                 board_chance: float = bombs.BOARD_BOMB_CHANCE) -> None:
         """Make a PlayerTwo
+
+        Args:
+            seed: int seed of the room's bomb events, random if not given
+            center_chance: float chance of the center being cleared after a move
+            board_chance: float chance of the whole board being cleared after a move that did not clear the center
         """
         self.windowSetUp()
-        self.initTKVariables()
+        self.initTKVariables(seed, center_chance, board_chance)
         self.createHostPortEntry()
         self.setUsername()
         self.confirmInstructions()
         self.runGame()
         self.runUI(self.window)
 
-    def initTKVariables(self) -> None:
+    def initTKVariables(self, seed: int = None, center_chance: float = bombs.CENTER_BOMB_CHANCE,
+                        board_chance: float = bombs.BOARD_BOMB_CHANCE) -> None:
         """Initiates Tk variables
+
+        Args:
+            seed: int seed of the room's bomb events, random if not given
+            center_chance: float chance of the center being cleared after a move
+            board_chance: float chance of the whole board being cleared after a move that did not clear the center
         """
         self.host = tk.StringVar()
         self.port = tk.IntVar()
@@ -62,6 +89,19 @@ class PlayerTwo:
         self.p2_username.set("$")
         self.try_again = tk.StringVar()
         self.try_again.set("@")
+        self.game_moves = []
+        self.guard = peerguard.ConnectionGuard()
+        self.token = session.newToken()
+        self.phase = "X"
+        self.dropped = False
+        self.scheduler = bombs.BombScheduler(seed, center_chance, board_chance)
+        self.bombs = self.scheduler.newGame()
+        self.stats = statsapi.StatsStore(liveGames=lambda: 0 if self.dropped else 1)
+        try:
+            statsapi.serveStats(self.stats)
+        except OSError as error:
+            # Another host on this machine may already serve the API; the game does not need it.
+            print(f"Stats API not started: {error}", file=sys.stderr)
 
     def windowSetUp(self) -> None:
         """Sets up TKinter window
@@ -84,6 +124,7 @@ class PlayerTwo:
                 self.server.bind((self.host.get(), self.port.get()))
                 self.server.listen(1)
                 self.connection, self.clientAddress = self.server.accept()
+                session.keepAlive(self.connection)
                 break
             except (ConnectionRefusedError, OverflowError, socket.error):
                 while self.try_again.get()[0].upper() != "Y" and self.try_again.get()[0].upper() != "N":
@@ -100,7 +141,10 @@ class PlayerTwo:
     def setUsername(self) -> None:
         """Makes sure that the user sets up an alphanumeric username.
         """
-        self.p1_username.set(self.connection.recv(1024).decode())
+        try:
+            self.p1_username.set(peerguard.checkUsername(self.guard.receive(self.connection)))
+        except (peerguard.PeerMisbehaving, OSError) as error:
+            self.dropPeer(str(error))
         while not self.p2_username.get().isalnum():
             self.p2_username.set(simpledialog.askstring("Tic-Tac-Toe: Username", prompt="Player2, you will be o/O. "
                                                                                         "Please enter an alphanumeric "
@@ -108,7 +152,7 @@ class PlayerTwo:
                                                                                         "allowed. You will be asked "
                                                                                         "again if you username is "
                                                                                         "invalid: "))
-        self.sendInformation(self.p2_username.get())
+        self.sendInformation(session.encodeGreeting(self.p2_username.get(), self.token))
 
     def confirmInstructions(self) -> None:
         """Makes sure user understands Tic-Tac-Toe.
@@ -129,7 +173,70 @@ class PlayerTwo:
         Args:
             user_entry: A string containing whatever the user wants to send over
         """
-        self.connection.sendall(user_entry.encode())
+        try:
+            self.connection.sendall(peerguard.encodeMessage(user_entry))
+        except OSError as error:
+            # Everything sent is already on the game board, so the snapshot catches player1 up.
+            if not self.awaitResume():
+                self.dropPeer(str(error))
+
+    def receiveInformation(self) -> str:
+        """Receives information through sockets, waiting for player1 to resume if the connection drops.
+
+        Returns:
+            A string containing what player1 sent
+
+        Raises:
+            OSError: The connection dropped and player1 did not resume in time
+            PeerMisbehaving: Player1 went over its rate limits
+        """
+        while True:
+            try:
+                return self.guard.receive(self.connection)
+            except OSError:
+                if not self.awaitResume():
+                    raise
+
+    def awaitResume(self) -> bool:
+        """Holds the game open for player1 to reconnect with its resume token and sends it a snapshot.
+
+        Returns:
+            A bool value indicating if player1 resumed within the grace period
+        """
+        self.connection.close()
+        if self.dropped or not hasattr(self, "p2_gameboard"):
+            return False
+        deadline = time.monotonic() + session.RESUME_GRACE
+        waiting = tk.Label(self.window, text=f"Waiting for {self.p1_username.get()} to reconnect...",
+                           bg="blue", fg="white")
+        waiting.grid(row=2, column=4)
+        try:
+            while time.monotonic() < deadline:
+                # Accept in short slices so the window keeps redrawing; user input waits until the game resumes.
+                self.window.update_idletasks()
+                self.server.settimeout(min(session.POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+                try:
+                    connection, address = self.server.accept()
+                except socket.timeout:
+                    continue
+                except OSError:
+                    return False
+                guard = peerguard.ConnectionGuard()
+                try:
+                    connection.settimeout(max(0.0, deadline - time.monotonic()))
+                    if session.checkResume(guard.receive(connection), self.token):
+                        connection.settimeout(None)
+                        connection.sendall(peerguard.encodeMessage(session.encodeSnapshot(self.p2_gameboard,
+                                                                                          self.phase)))
+                        self.connection, self.clientAddress, self.guard = session.keepAlive(connection), address, guard
+                        return True
+                except (peerguard.PeerMisbehaving, OSError):
+                    pass
+                connection.close()
+            return False
+        finally:
+            self.server.settimeout(None)
+            waiting.destroy()
 
     def createGameBoard(self) -> None:
         """Creates board of interactive buttons.
@@ -143,27 +250,14 @@ class PlayerTwo:
                 row[-1].grid(row=x+1, column=y, sticky="nsew")
             self.entire_board.append(row)
             if x == 2 and y == 2:
-                p1_move = self.connection.recv(1024).decode()
-                if p1_move == "center":
-                    self.p2_gameboard.updateGameBoard(int(p1_move[-2]), int(p1_move[-1]), "X", self.p1_username.get())
-                    self.entire_board[int(p1_move[-2])][int(p1_move[-1])]['text'] = 'X'
-                    self.entire_board[int(p1_move[-2])][int(p1_move[-1])]['state'] = 'disabled'
-                    self.entire_board[int(p1_move[-2])][int(p1_move[-1])].update()
-                    tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event",
-                                           message="The center of the board was cleared!")
-                    self.entire_board[1][1]['text'] = ""
-                    self.entire_board[1][1]['state'] = "normal"
-                elif p1_move == "boom":
-                    self.resetGameboards()
-                    tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event",
-                                           message="BOOM! The entire board was cleared")
-                else:
-                    self.p2_gameboard.updateGameBoard(int(p1_move[0]), int(p1_move[1]), "X", self.p1_username.get())
-                    self.entire_board[int(p1_move[0])][int(p1_move[1])]['text'] = 'X'
-                    self.entire_board[int(p1_move[0])][int(p1_move[1])]['state'] = 'disabled'
+                p1_move = self.receiveValidMove()
+                if p1_move is None:
+                    break
+                self.placeOpponentMove(p1_move)
         self.your_turn = tk.Label(text=f'It is currently {self.p2_username.get()}\'s turn', bg='blue', fg='white')
         self.your_turn.grid(row=1, column=4)
 
+    @profiler.profiled
     def initiateGame(self, x: int, y: int, player: str) -> None:
         """Places users piece on board, handles if a games end, and calls receiveMove() function.
 
@@ -176,15 +270,16 @@ class PlayerTwo:
         self.entire_board[x][y].config(text=player)
         self.entire_board[x][y]['state'] = 'disabled'
         self.entire_board[x][y].update()
-        p2_move = str(x) + str(y)
-        random_bomb = self.random_bomb()
-        if type(random_bomb) == str:
-            game_ended = self.checkWinTie(player)
-            self.sendInformation(random_bomb + p2_move)
-        else:
-            self.sendInformation(p2_move)
-            game_ended = self.checkWinTie(player)
-        if game_ended:
+        event = self.bombs.nextEvent()
+        p2_move = event + str(x) + str(y)
+        self.game_moves.append(p2_move)
+        self.playBomb(event)
+        # Score the game before sending, so a snapshot sent while resuming already has the game over.
+        win, tie = self.scoreGame(player)
+        self.sendInformation(p2_move)
+        self.showBomb(event)
+        if win or tie:
+            self.afterGame(win, tie)
             if self.p1_decision == "Play Again":
                 self.resetGameboards()
                 self.receiveMove()
@@ -203,32 +298,20 @@ class PlayerTwo:
             self.opp_turn.update()
             self.receiveMove()
 
+    @profiler.profiled
     def receiveMove(self) -> None:
         """Places opponents piece on board, handles if a games end
         """
-        p1_move = self.connection.recv(1024).decode()
-        if "center" in p1_move:
-            self.p2_gameboard.updateGameBoard(int(p1_move[-2]), int(p1_move[-1]), "X", self.p1_username.get())
-            self.entire_board[int(p1_move[-2])][int(p1_move[-1])]['text'] = 'X'
-            self.entire_board[int(p1_move[-2])][int(p1_move[-1])]['state'] = 'disabled'
-            self.entire_board[int(p1_move[-2])][int(p1_move[-1])].update()
-            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="The center of the board was cleared!")
-            self.entire_board[1][1]['text'] = ""
-            self.entire_board[1][1]['state'] = "normal"
-        elif "boom" in p1_move:
-            self.resetGameboards()
-            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="BOOM! The entire board was cleared")
-        else:
-            self.entire_board[int(p1_move[0])][int(p1_move[1])].config(text="X")
-            self.entire_board[int(p1_move[0])][int(p1_move[1])]['state'] = 'disabled'
-            self.p2_gameboard.updateGameBoard(int(p1_move[0]), int(p1_move[1]), "X", self.p1_username.get())
-            self.entire_board[int(p1_move[0])][int(p1_move[1])].update()
+        p1_move = self.receiveValidMove()
+        if p1_move is None:
+            return
+        win, tie = self.placeOpponentMove(p1_move)
         self.opp_turn.destroy()
         self.your_turn = tk.Label(text=f'It is currently {self.p2_username.get()}\'s turn', bg='blue', fg='white')
         self.your_turn.grid(row=1, column=4)
         self.your_turn.update()
-        game_ended = self.checkWinTie("X")
-        if game_ended:
+        if win or tie:
+            self.afterGame(win, tie)
             if self.p1_decision == 'Play Again':
                 self.resetGameboards()
                 self.receiveMove()
@@ -241,6 +324,90 @@ class PlayerTwo:
                         self.entire_board[x][y]['state'] = "disabled"
                         self.entire_board[x][y].update()
 
+    def receiveValidMove(self) -> str:
+        """Receives player1's move and checks it against the game board.
+
+        Returns:
+            A string containing the move as it was sent, or None if player1 was cut off
+        """
+        try:
+            p1_move = self.receiveInformation()
+            bomb, x, y = peerguard.parseMove(p1_move)
+            if bomb:
+                raise peerguard.PeerMisbehaving("a bomb event from player1")
+            if not self.p2_gameboard.isValidMove(x, y, "X"):
+                raise peerguard.PeerMisbehaving(f"an illegal move {p1_move!r}")
+        except (peerguard.PeerMisbehaving, OSError) as error:
+            self.dropPeer(str(error))
+            return None
+        return p1_move
+
+    def placeOpponentMove(self, p1_move: str) -> tuple:
+        """Places player1's move, decides its bomb event, scores the game and tells player1 the event.
+
+        Args:
+            p1_move: A string containing player1's move as returned by receiveValidMove()
+
+        Returns:
+            A tuple of bools containing whether a win and whether a tie has occurred
+        """
+        x, y = int(p1_move[0]), int(p1_move[1])
+        self.p2_gameboard.updateGameBoard(x, y, "X", self.p1_username.get())
+        self.entire_board[x][y]['text'] = 'X'
+        self.entire_board[x][y]['state'] = 'disabled'
+        self.entire_board[x][y].update()
+        event = self.bombs.nextEvent()
+        self.game_moves.append(event + p1_move)
+        self.playBomb(event)
+        win, tie = self.scoreGame("X")
+        self.sendInformation(f"EVENT {event or 'none'}")
+        self.showBomb(event)
+        return win, tie
+
+    def playBomb(self, event: str) -> None:
+        """Plays a bomb event on the game board and the buttons.
+
+        Args:
+            event: A string containing "center", "boom" or "" if nothing happens
+        """
+        if event == "center":
+            self.p2_gameboard.bomb_center_board()
+            self.entire_board[1][1]['text'] = ""
+            self.entire_board[1][1]['state'] = "normal"
+        elif event == "boom":
+            self.resetGameboards()
+
+    def showBomb(self, event: str) -> None:
+        """Tells the user about a bomb event.
+
+        Args:
+            event: A string containing "center", "boom" or "" if nothing happens
+        """
+        if event == "center":
+            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="The center of the board was cleared!")
+        elif event == "boom":
+            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="BOOM! The entire board was cleared")
+
+    def dropPeer(self, reason: str) -> None:
+        """Cuts off player1 after it misbehaved or the connection failed.
+
+        Args:
+            reason: A string describing what went wrong
+        """
+        if self.dropped:
+            return
+        self.dropped = True
+        self.connection.close()
+        tk.messagebox.showerror(title="Tic-Tac-Toe: Connection Closed",
+                                message=f"Player1 was disconnected: {reason}.")
+        if not hasattr(self, "entire_board"):
+            self.window.destroy()
+            sys.exit()
+        for x in range(3):
+            for y in range(3):
+                self.entire_board[x][y]['state'] = "disabled"
+
+    @profiler.profiled
     def afterGame(self, win: bool, tie: bool) -> None:
         """Deals with whatever decision player1 decides to do after a game ends.
 
@@ -248,15 +415,20 @@ class PlayerTwo:
             win: bool containing whether a win has occurred
             tie: bool containing whether a tie has occurred
         """
-        self.p2_gameboard.updateGamesPlayed()
         if win:
             tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Results",
                                    message=f"Game Over! {self.p2_gameboard.getLastPlayer()} has won the game!")
         elif tie:
             tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Results",
                                    message=f"Game Over! The game against {self.p1_username.get()} has ended in a tie")
-        self.p1_decision = self.connection.recv(1024).decode()
+        try:
+            self.p1_decision = peerguard.checkDecision(self.receiveInformation())
+        except (peerguard.PeerMisbehaving, OSError) as error:
+            self.p1_decision = None
+            self.dropPeer(str(error))
+        self.phase = "X"
         if self.p1_decision == "Play Again":
+            self.bombs = self.scheduler.newGame()
             self.your_turn.destroy()
             self.opp_turn = tk.Label(text=f'It is currently {self.p1_username.get()}\'s turn', bg='blue', fg='white')
             self.opp_turn.grid(row=1, column=4)
@@ -290,24 +462,32 @@ class PlayerTwo:
                                             text=f"{self.p2_gameboard.getGames()}", bg="blue", fg="white")
             gameStatsGames1.grid(row=10, column=1)
 
-    def checkWinTie(self, player: str) -> bool:
-        """Checks whether there was a winner from the last turn.
+    @profiler.profiled
+    def scoreGame(self, player: str) -> tuple:
+        """Checks whether the last turn ended the game, counts and archives it if it did and sets the phase.
 
         Args:
-            player: A string containing character "X" or "O"
+            player: A string containing the character "X" or "O" of the last turn
 
         Returns:
-            A bool value indicating whether ot not a game has ended
+            A tuple of bools containing whether a win and whether a tie has occurred
         """
         win = self.p2_gameboard.isWinner(player)
         tie = self.p2_gameboard.boardIsFull()
         if win and tie:
             self.p2_gameboard.decrementTies()
-        if win or tie:
-            self.afterGame(win, tie)
-            return True
-        else:
-            return False
+        if not (win or tie):
+            self.phase = "O" if player == "X" else "X"
+            return win, tie
+        self.p2_gameboard.updateGamesPlayed()
+        record = analytics.makeRecord(self.p1_username.get(), self.p2_username.get(), self.game_moves,
+                                      self.p2_gameboard.getLastPlayer() if win else None, self.scheduler.seed,
+                                      self.bombs.game)
+        analytics.appendRecord(record)
+        self.stats.recordGame(record)
+        self.game_moves = []
+        self.phase = "R"
+        return win, tie
 
     def resetGameboards(self) -> None:
         """Resets the game board
@@ -323,20 +503,6 @@ class PlayerTwo:
         """
         self.createGameBoard()
 
-    def random_bomb(self):
-        rand = random.randrange(1, 10)
-        if rand == 1:
-            self.entire_board[1][1]['text'] = ""
-            self.entire_board[1][1]['state'] = "normal"
-            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="The center of the board was cleared!")
-            return "center"
-        rand2 = random.randrange(1, 100)
-        if rand2 == 1:
-            self.resetGameboards()
-            tk.messagebox.showinfo(title="Tic-Tac-Toe: Game Event", message="BOOM! The entire board was cleared")
-            return "boom"
-        return False
-
     def runUI(self, windowName: tk) -> None:
         """Activates our window for use
 
@@ -347,4 +513,5 @@ class PlayerTwo:
 
 
 if __name__ == "__main__":
-    player_two = PlayerTwo()
+    profiler.installSignalHandler()
+    player_two = PlayerTwo(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,199 @@
+"""Class that samples where a running game spends its time, on demand.
+
+    Profiling is off until it is toggled, by sending the process SIGUSR2 or
+    running "python profiler.py <pid>". While it is on, a background thread
+    samples the call stack of every thread that is inside a method marked
+    with @profiled, such as the turn handlers of the player windows and the
+    room loop of the multiplex host. Toggling it off again writes the samples
+    as collapsed stacks ("main;runUI;initiateGame;checkWinTie 12"), which
+    flamegraph.pl and speedscope read as they are.
+
+    Samples are counted per distinct stack and the number of distinct stacks
+    and their depth are capped, so the memory used stays bounded however long
+    profiling is left on.
+
+    Typical usage example:
+
+    installSignalHandler()
+    PROFILER.toggle()
+"""
+
+
+import functools
+import os
+import signal
+import sys
+import threading
+import time
+
+
+SAMPLE_INTERVAL = 0.005
+MAX_STACKS = 10000
+MAX_DEPTH = 64
+TRUNCATED = "[truncated]"
+
+
+class SamplingProfiler:
+    """A simple class that samples the stacks of threads inside profiled methods.
+
+    Attributes:
+        interval: The number of seconds between samples
+        max_stacks: The largest number of distinct stacks kept
+        output_dir: The directory collapsed stack files are written to
+        stacks: A dict of collapsed stack to its number of samples
+        armed: Boolean for if profiling is on
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, max_stacks: int = MAX_STACKS,
+                 output_dir: str = ".") -> None:
+        """Make a SamplingProfiler.
+
+        Args:
+            interval: float number of seconds between samples
+            max_stacks: int largest number of distinct stacks kept
+            output_dir: str value of the directory collapsed stack files are written to
+        """
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.output_dir = output_dir
+        self.stacks = {}
+        self.armed = False
+        self._sections = {}
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Turns profiling on.
+        """
+        if self.armed:
+            return
+        self.stacks = {}
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        self.armed = True
+
+    def stop(self) -> str:
+        """Turns profiling off and writes what was sampled.
+
+        Returns:
+            A string containing the path of the collapsed stack file, or None if profiling was off
+        """
+        if not self.armed:
+            return None
+        self.armed = False
+        self._stopping.set()
+        self._thread.join()
+        path = os.path.join(self.output_dir, f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        self.write(path)
+        return path
+
+    def toggle(self) -> str:
+        """Turns profiling on if it is off, or off if it is on.
+
+        Returns:
+            A string containing the path of the collapsed stack file if profiling was turned off, or None
+        """
+        if self.armed:
+            return self.stop()
+        self.start()
+        return None
+
+    def enter(self) -> None:
+        """Marks the current thread as inside a profiled method.
+        """
+        ident = threading.get_ident()
+        self._sections[ident] = self._sections.get(ident, 0) + 1
+
+    def exit(self) -> None:
+        """Marks the current thread as leaving a profiled method.
+        """
+        ident = threading.get_ident()
+        depth = self._sections.get(ident, 0) - 1
+        if depth > 0:
+            self._sections[ident] = depth
+        else:
+            self._sections.pop(ident, None)
+
+    def write(self, path: str) -> None:
+        """Writes the samples as collapsed stacks.
+
+        Args:
+            path: str value of the path of the file
+        """
+        with open(path, "w", encoding="utf-8") as folded:
+            for stack, count in sorted(self.stacks.items()):
+                folded.write(f"{stack} {count}\n")
+
+    def _run(self) -> None:
+        """Samples the threads inside profiled methods until profiling is turned off.
+        """
+        while not self._stopping.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self._sections):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._record(frame)
+
+    def _record(self, frame) -> None:
+        """Adds one sample of a stack.
+
+        Args:
+            frame: The innermost frame of the sampled thread
+        """
+        names = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if frame is not None:
+            names.append(TRUNCATED)
+        stack = ";".join(reversed(names))
+        if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+            stack = TRUNCATED
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+
+PROFILER = SamplingProfiler()
+
+
+def profiled(function):
+    """Marks a method so its stacks are sampled while profiling is on.
+
+    Args:
+        function: The function or method to mark
+
+    Returns:
+        The wrapped function, which only checks a flag while profiling is off
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.armed:
+            return function(*args, **kwargs)
+        PROFILER.enter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            PROFILER.exit()
+    return wrapper
+
+
+def installSignalHandler() -> bool:
+    """Lets SIGUSR2 toggle profiling. Must be called from the main thread.
+
+    Returns:
+        A bool value indicating if the platform has SIGUSR2
+    """
+    if not hasattr(signal, "SIGUSR2"):
+        return False
+
+    def handler(signum, frame) -> None:
+        path = PROFILER.toggle()
+        print(f"Profiling written to {path}" if path else "Profiling started", file=sys.stderr)
+
+    signal.signal(signal.SIGUSR2, handler)
+    return True
+
+
+if __name__ == "__main__":
+    os.kill(int(sys.argv[1]), signal.SIGUSR2)
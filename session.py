@@ -0,0 +1,183 @@
+"""Functions that let player1 resume a game after its connection drops.
+
+    When the game starts, the host sends player1 a resume token together with
+    its username. If the connection drops, the host keeps the game open for
+    RESUME_GRACE seconds and player1 reconnects with that token. Instead of
+    replaying every move, the host answers with one compact snapshot of its
+    BoardClass: the board, the last player, the win/tie/loss/games totals and
+    whose turn it is. Player1 mirrors the totals, since a win of the host is a
+    loss of player1, and carries on from there.
+
+    A snapshot looks like "SNAP X-O-X----|bob|1|0|2|3|X": the board row by row
+    with "-" for empty squares, the last player, the host's wins, ties, losses
+    and games, and the phase: "X" when player1 has to move, "O" when player1 is
+    waiting on the host's move and "R" when player1 has to answer the rematch
+    question.
+
+    A peer that drops without closing its connection (a Wi-Fi or mobile
+    handoff, a NAT timeout) sends nothing at all, so keepAlive() turns on TCP
+    keepalive and a send timeout for both players' sockets. A blocked recv() or
+    sendall() then fails within about KEEPALIVE_IDLE + KEEPALIVE_INTERVAL *
+    KEEPALIVE_COUNT seconds and the resume starts.
+
+    Typical usage example:
+
+    token = newToken()
+    snapshot, phase = decodeSnapshot(encodeSnapshot(player2_gameboard, "X"))
+"""
+
+
+import hmac
+import secrets
+import socket
+
+
+RESUME_GRACE = 30.0
+RETRY_DELAY = 0.25
+TOKEN_BYTES = 8
+PHASES = ("X", "O", "R")
+KEEPALIVE_IDLE = 5
+KEEPALIVE_INTERVAL = 2
+KEEPALIVE_COUNT = 3
+POLL_INTERVAL = 0.1
+
+
+def newToken() -> str:
+    """Makes a new resume token.
+
+    Returns:
+        A string of random hex digits
+    """
+    return secrets.token_hex(TOKEN_BYTES)
+
+
+def keepAlive(sock: socket.socket) -> socket.socket:
+    """Makes a connection notice within seconds that the peer silently went away.
+
+    Args:
+        sock: A connected socket
+
+    Returns:
+        The same socket
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # The finer options are not on every platform; plain keepalive still helps without them.
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+    elif hasattr(socket, "TCP_KEEPALIVE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, KEEPALIVE_IDLE)
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+    if hasattr(socket, "TCP_KEEPCNT"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+    if hasattr(socket, "TCP_USER_TIMEOUT"):
+        # Keepalive probes are only sent while nothing is unacknowledged; this covers a send to a dead peer.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT,
+                        1000 * (KEEPALIVE_IDLE + KEEPALIVE_INTERVAL * KEEPALIVE_COUNT))
+    return sock
+
+
+def encodeGreeting(username: str, token: str) -> str:
+    """Makes the message the host answers player1's username with.
+
+    Args:
+        username: str value of the host's username
+        token: str value of the resume token of the session
+
+    Returns:
+        A string containing the username and token
+    """
+    return f"{username} {token}"
+
+
+def decodeGreeting(message: str) -> tuple:
+    """Splits the host's greeting into the host's username and the resume token.
+
+    Args:
+        message: A string made by encodeGreeting()
+
+    Returns:
+        A tuple of the username and the token, which is None for a host that does not send one
+    """
+    username, _, token = message.partition(" ")
+    return username, token or None
+
+
+def encodeResume(token: str) -> str:
+    """Makes the first message of a reconnecting player1.
+
+    Args:
+        token: str value of the resume token of the session
+
+    Returns:
+        A string asking the host to resume the session
+    """
+    return f"RESUME {token}"
+
+
+def checkResume(message: str, token: str) -> bool:
+    """Checks if a message asks to resume a session.
+
+    Args:
+        message: A string received from a reconnecting peer
+        token: str value of the resume token of the session
+
+    Returns:
+        A bool value indicating if the message carries the right token
+    """
+    command, _, sent = message.partition(" ")
+    return command == "RESUME" and hmac.compare_digest(sent.encode(), token.encode())
+
+
+def encodeSnapshot(gameboard, phase: str) -> str:
+    """Makes a snapshot of a game.
+
+    Args:
+        gameboard: The host's BoardClass
+        phase: str value of "X" if player1 has to move, "O" if it waits on the host or "R" if it has to answer
+            the rematch question
+
+    Returns:
+        A string containing the snapshot
+    """
+    state = gameboard.getSnapshot()
+    board = "".join(value if value in ("X", "O") else "-" for row in state["board"] for value in row)
+    return "SNAP " + "|".join((board, state["last_player"] or "", str(state["wins"]), str(state["ties"]),
+                               str(state["losses"]), str(state["games"]), phase))
+
+
+def decodeSnapshot(message: str) -> tuple:
+    """Reads a snapshot made by encodeSnapshot().
+
+    Args:
+        message: A string containing the snapshot
+
+    Returns:
+        A tuple of a snapshot dict for BoardClass.loadSnapshot() and the phase
+
+    Raises:
+        ValueError: The message is not a snapshot
+    """
+    if not message.startswith("SNAP "):
+        raise ValueError("not a snapshot")
+    board, last_player, wins, ties, losses, games, phase = message[5:].split("|")
+    if len(board) != 9 or phase not in PHASES:
+        raise ValueError("not a snapshot")
+    snapshot = {"board": [[" " if value == "-" else value for value in board[x * 3:x * 3 + 3]] for x in range(3)],
+                "last_player": last_player or None, "wins": int(wins), "ties": int(ties),
+                "losses": int(losses), "games": int(games)}
+    return snapshot, phase
+
+
+def mirrorSnapshot(snapshot: dict) -> dict:
+    """Turns a snapshot of the host's totals into one of player1's totals.
+
+    Args:
+        snapshot: A snapshot dict from decodeSnapshot()
+
+    Returns:
+        A new snapshot dict with the wins and losses swapped
+    """
+    mirrored = dict(snapshot)
+    mirrored["wins"], mirrored["losses"] = snapshot["losses"], snapshot["wins"]
+    return mirrored
@@ -0,0 +1,338 @@
+"""Classes that serve game statistics and leaderboards over local HTTP.
+
+    Results used to be visible only in the labels afterGame builds or on
+    stdout through BoardClass.printStats. The StatsServer answers JSON
+    requests on the host:
+
+        /players/<username>     wins, ties, losses, games and average game length
+        /leaderboard?top=<n>    the n users with the most wins
+        /games                  live and finished game counts
+
+    The StatsStore folds in every game the host finishes, and the local game
+    archive is folded in on a background thread so a large archive does not
+    hold up the host starting. Folding a game only holds the store's lock for
+    a few dict updates; leaderboards copy the totals under the lock and sort
+    the copy outside it. Responses are cached for CACHE_TTL seconds under
+    their route, with top clamped and other query parameters left out, and a
+    finished game only drops the responses it changes: its two players,
+    /games and the leaderboards. Dashboards polling hard are answered from
+    memory and never wait on the game loop.
+
+    Typical usage example:
+
+    store = StatsStore()
+    serveStats(store, "127.0.0.1", STATS_PORT)
+"""
+
+
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+import analytics
+
+
+STATS_PORT = 8080
+CACHE_TTL = 2.0
+DEFAULT_TOP = 10
+MAX_TOP = 100
+
+
+class StatsStore:
+    """A simple class that keeps the totals of every finished game.
+
+    Attributes:
+        stats: The GameStats of every finished game
+        caches: The ResponseCaches to drop answers from when the totals change
+        loaded: An Event set once the archive is folded in
+    """
+
+    def __init__(self, archive: str = analytics.ARCHIVE_PATH, liveGames=None) -> None:
+        """Make a StatsStore.
+
+        Args:
+            archive: str value of the path of the archive to start from, or None to start empty
+            liveGames: A function returning the number of games being played, or None
+        """
+        self.stats = analytics.GameStats()
+        self.caches = []
+        self.loaded = threading.Event()
+        self._liveGames = liveGames
+        self._lock = threading.Lock()
+        if archive is not None and os.path.exists(archive):
+            # Games finished while loading are appended after this size, and folded in by recordGame.
+            size = os.path.getsize(archive)
+            threading.Thread(target=self._load, args=(archive, size), name="stats-load", daemon=True).start()
+        else:
+            self.loaded.set()
+
+    def _load(self, archive: str, size: int) -> None:
+        """Folds in the start of an archive, run on a background thread.
+
+        Args:
+            archive: str value of the path of the archive
+            size: int number of bytes of the archive to fold
+        """
+        try:
+            loaded = analytics.analyze([archive], workers=1, sizes=[size])
+        except OSError as error:
+            print(f"Could not load {archive}: {error}", file=sys.stderr)
+        else:
+            with self._lock:
+                loaded.merge(self.stats)
+                self.stats = loaded
+            for cache in self.caches:
+                cache.clear()
+        finally:
+            self.loaded.set()
+
+    def recordGame(self, record: dict) -> None:
+        """Folds in a game that just finished and drops the cached answers it changes.
+
+        Args:
+            record: A dict made by analytics.makeRecord()
+        """
+        with self._lock:
+            self.stats.fold(record)
+        for cache in self.caches:
+            cache.forget((record["p1"], record["p2"]))
+
+    def playerStats(self, username: str) -> dict:
+        """Gets the totals of a user.
+
+        Args:
+            username: str value of the username to look up
+
+        Returns:
+            A dict of the user's totals, or None if the user never finished a game
+        """
+        with self._lock:
+            if username not in self.stats.users:
+                return None
+            wins, ties, losses, games, _ = self.stats.users[username]
+            return {"username": username, "wins": wins, "ties": ties, "losses": losses, "games": games,
+                    "average_game_length": self.stats.averageGameLength(username)}
+
+    def leaderboard(self, top: int) -> list:
+        """Gets the users with the most wins.
+
+        Args:
+            top: int number of users to return
+
+        Returns:
+            A list of dicts of rank, username, wins, losses, ties and games, best first
+        """
+        with self._lock:
+            users = [(username, *totals) for username, totals in self.stats.users.items()]
+        ranked = heapq.nsmallest(top, users, key=lambda user: (-user[1], user[3], user[0]))
+        return [{"rank": rank, "username": username, "wins": wins, "losses": losses, "ties": ties, "games": games}
+                for rank, (username, wins, ties, losses, games, _) in enumerate(ranked, 1)]
+
+    def gameCounts(self) -> dict:
+        """Gets the number of games being played and finished.
+
+        Returns:
+            A dict containing the live and finished game counts
+        """
+        return {"live": self._liveGames() if self._liveGames else 0, "finished": self.stats.games}
+
+
+class ResponseCache:
+    """A simple class that keeps response bodies for a short time.
+
+    Responses are kept under their route, a tuple such as ("players", username),
+    ("leaderboard", top) or ("games",). Leaderboards are kept apart from the
+    rest, since every finished game drops all of them.
+
+    Attributes:
+        ttl: The number of seconds a response is kept
+        generation: The number of times responses were dropped
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL) -> None:
+        """Make a ResponseCache.
+
+        Args:
+            ttl: float number of seconds a response is kept
+        """
+        self.ttl = ttl
+        self.generation = 0
+        self._responses = {}
+        self._leaderboards = {}
+
+    def _table(self, route: tuple) -> dict:
+        """Gets the dict a route is kept in.
+
+        Args:
+            route: A tuple naming the response
+
+        Returns:
+            The dict of leaderboards or of every other response
+        """
+        return self._leaderboards if route[0] == "leaderboard" else self._responses
+
+    def get(self, route: tuple) -> bytes:
+        """Looks up a response that is still fresh.
+
+        Args:
+            route: A tuple naming the response
+
+        Returns:
+            The bytes of the body, or None if there is no fresh response
+        """
+        cached = self._table(route).get(route)
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return cached[1]
+
+    def put(self, route: tuple, body: bytes, generation: int) -> None:
+        """Stores a response, unless responses were dropped since it was worked out.
+
+        Args:
+            route: A tuple naming the response
+            body: bytes of the body
+            generation: int value of generation before the response was worked out
+        """
+        if generation != self.generation:
+            return
+        table = self._table(route)
+        if len(table) > 4 * MAX_TOP and route not in table:
+            table.clear()
+        table[route] = (time.monotonic() + self.ttl, body)
+
+    def forget(self, usernames: tuple) -> None:
+        """Drops the responses a finished game changes.
+
+        Args:
+            usernames: A tuple of the str usernames of the game's players
+        """
+        self.generation += 1
+        for username in usernames:
+            self._responses.pop(("players", username), None)
+        self._responses.pop(("games",), None)
+        self._leaderboards.clear()
+
+    def clear(self) -> None:
+        """Drops every response.
+        """
+        self.generation += 1
+        self._responses.clear()
+        self._leaderboards.clear()
+
+
+class _StatsHandler(BaseHTTPRequestHandler):
+    """Answers the requests of a StatsServer.
+    """
+    protocol_version = "HTTP/1.1"
+    # Send each response in one write, without waiting on Nagle's algorithm.
+    wbufsize = 65536
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        """Answers a GET request from the cache, or works the answer out and caches it.
+        """
+        cache = self.server.cache
+        status, route = self._route()
+        body = cache.get(route) if status == 200 else None
+        if body is None:
+            generation = cache.generation
+            status, answer = self._answer(self.server.store, route) if status == 200 else (status, route)
+            body = json.dumps(answer, separators=(",", ":")).encode()
+            if status == 200:
+                cache.put(route, body, generation)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", f"max-age={int(self.server.cache.ttl)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self) -> tuple:
+        """Works out which answer the request asks for, leaving out anything that does not change it.
+
+        Returns:
+            A tuple of 200 and the route of the answer, or of the HTTP status and the JSON-ready error
+        """
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        if len(parts) == 2 and parts[0] == "players":
+            return 200, ("players", parts[1])
+        if parts == ["leaderboard"]:
+            try:
+                top = int(parse_qs(url.query).get("top", [DEFAULT_TOP])[0])
+            except ValueError:
+                return 400, {"error": "top must be a number"}
+            return 200, ("leaderboard", max(1, min(top, MAX_TOP)))
+        if parts == ["games"]:
+            return 200, ("games",)
+        return 404, {"error": "unknown path"}
+
+    def _answer(self, store: StatsStore, route: tuple) -> tuple:
+        """Works out the answer to a route.
+
+        Args:
+            store: The StatsStore to answer from
+            route: A tuple as returned by _route()
+
+        Returns:
+            A tuple of the HTTP status and the JSON-ready answer
+        """
+        if route[0] == "players":
+            player = store.playerStats(route[1])
+            return (200, player) if player else (404, {"error": "unknown player"})
+        if route[0] == "leaderboard":
+            return 200, store.leaderboard(route[1])
+        return 200, store.gameCounts()
+
+    def log_message(self, format: str, *args) -> None:
+        """Keeps request logging off stderr, which is far slower than answering from the cache.
+        """
+
+
+class StatsServer(ThreadingHTTPServer):
+    """A simple class that serves a StatsStore over HTTP.
+
+    Attributes:
+        store: The StatsStore answered from
+        cache: The ResponseCache of recent answers
+    """
+    daemon_threads = True
+
+    def __init__(self, store: StatsStore, host: str, port: int, ttl: float = CACHE_TTL) -> None:
+        """Make a StatsServer.
+
+        Args:
+            store: The StatsStore to answer from
+            host: str value of the host to listen on
+            port: int value of the port to listen on
+            ttl: float number of seconds a response is cached
+        """
+        super().__init__((host, port), _StatsHandler)
+        self.store = store
+        self.cache = ResponseCache(ttl)
+        store.caches.append(self.cache)
+
+
+def serveStats(store: StatsStore, host: str = "127.0.0.1", port: int = STATS_PORT) -> StatsServer:
+    """Starts serving a StatsStore in a background thread.
+
+    Args:
+        store: The StatsStore to answer from
+        host: str value of the host to listen on
+        port: int value of the port to listen on
+
+    Returns:
+        The running StatsServer
+    """
+    server = StatsServer(store, host, port)
+    threading.Thread(target=server.serve_forever, name="stats", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    StatsServer(StatsStore(sys.argv[1] if len(sys.argv) > 1 else analytics.ARCHIVE_PATH),
+                "127.0.0.1", STATS_PORT).serve_forever()